@@ -1,2 +1,3 @@
 cm2kpc: float = 3.24078e-22
 default_kpc_distance: float = 10.0
+gwosc_file_duration: float = 4096.0
@@ -0,0 +1,59 @@
+import h5py
+import numpy as np
+from typing import Any, Dict
+from numpy.typing import NDArray
+
+from core.types import WindowBatch
+
+
+class DatasetFormat:
+    VERSION: int = 2
+    LEGACY_VERSION: int = 1
+    TIME_FORMATS = ("compact", "full")
+
+    @staticmethod
+    def time_datasets(batch: WindowBatch, time_format: str = "compact") -> Dict[str, NDArray[np.float64]]:
+        if time_format not in DatasetFormat.TIME_FORMATS:
+            raise ValueError(f"time_format must be one of {DatasetFormat.TIME_FORMATS}, got {time_format}")
+        if time_format == "full":
+            return {'times': batch.times}
+        return {'t0s': batch.t0s}
+
+    @staticmethod
+    def attributes(batch: WindowBatch, time_format: str = "compact") -> Dict[str, Any]:
+        return {
+            'format_version': DatasetFormat.VERSION,
+            'time_format': time_format,
+            'delta_t': batch.delta_t
+        }
+
+    @staticmethod
+    def version(f: h5py.File) -> int:
+        return int(f.attrs.get('format_version', DatasetFormat.LEGACY_VERSION))
+
+    @staticmethod
+    def delta_t(f: h5py.File) -> float:
+        if 'delta_t' in f.attrs:
+            return float(f.attrs['delta_t'])
+        first_time = f['times'][0, :2]
+        return float(first_time[1] - first_time[0])
+
+    @staticmethod
+    def times(f: h5py.File, index: Any = slice(None)) -> NDArray[np.float64]:
+        if 'times' in f:
+            return f['times'][index]
+        t0s = f['t0s'][index]
+        return np.asarray(t0s)[..., None] + np.arange(f['strains'].shape[1]) * DatasetFormat.delta_t(f)
+
+    @staticmethod
+    def read(path: str, index: Any = slice(None), with_times: bool = True) -> Dict[str, NDArray]:
+        with h5py.File(path, 'r') as f:
+            data = {
+                name: dataset[index]
+                for name, dataset in f.items()
+                if name not in ('times', 't0s')
+            }
+            data['t0s'] = f['t0s'][index] if 't0s' in f else f['times'][index][..., 0]
+            if with_times:
+                data['times'] = DatasetFormat.times(f, index)
+        return data
@@ -1,55 +1,57 @@
 import requests
-from bs4 import BeautifulSoup
-from typing import List
+from typing import Dict, List
 
+from core.handlers.gwosc_segment_catalog import GWOSCSegmentCatalog
 from core.utils.logger import Logger
 from core.utils.source_sampling import get_sources_per_sample
+
 class GWOSCDataFetcher:
-    def match_gwosc_strain_timelines(n_samples: int) -> List[str]:
-        H1_complete_urls = GWOSCDataFetcher._get_gwosc_strain_urls(detector="H1", run="O3b_4KHZ_R1")
-        L1_complete_urls = GWOSCDataFetcher._get_gwosc_strain_urls(detector="L1", run="O3b_4KHZ_R1")
-        V1_complete_urls = GWOSCDataFetcher._get_gwosc_strain_urls(detector="V1", run="O3b_4KHZ_R1")
-        common_timelines = set(H1_complete_urls.keys()) & set(L1_complete_urls.keys()) & set(V1_complete_urls.keys())
+    DEFAULT_RUN: str = "O3b_4KHZ_R1"
+    DEFAULT_GPS_START: int = 1256655618
+    DEFAULT_GPS_END: int = 1269363618
 
-        H1_match_urls = []
-        L1_match_urls = []
-        V1_match_urls = []
+    @staticmethod
+    def match_gwosc_strain_timelines(
+        n_samples: int,
+        detectors: List[str] = None,
+        catalog: GWOSCSegmentCatalog = None,
+        run: str = DEFAULT_RUN,
+        gps_start: int = DEFAULT_GPS_START,
+        gps_end: int = DEFAULT_GPS_END,
+        min_duty_cycle: float = 100.0,
+        n_sources: int = None
+    ) -> Dict[str, List[str]]:
+        detectors = detectors or ["H1", "L1", "V1"]
+        catalog = catalog or GWOSCSegmentCatalog(path=".cache/gwosc_catalog.sqlite")
 
-        n_sources = get_sources_per_sample(n_samples=n_samples)
-        n_sources_collected = 0
+        for detector in detectors:
+            if catalog.is_fresh(run, detector, gps_start, gps_end):
+                Logger.info(f"Using cached GWOSC catalog for detector {detector} for run {run}", verbose=False)
+                continue
+            html = GWOSCDataFetcher._get_gwosc_archive_page(detector, run, gps_start, gps_end)
+            catalog.ingest_html(run, detector, html, gps_start, gps_end)
 
-        for timeline in common_timelines:
-            H1_match_urls.append(H1_complete_urls[timeline])
-            L1_match_urls.append(L1_complete_urls[timeline])
-            V1_match_urls.append(V1_complete_urls[timeline])
-            n_sources_collected += 1
-            if n_sources_collected >= n_sources:
-                break
-        Logger.info(f"Sources matched collected: {n_sources_collected}", verbose=False)
-        urls = {
-            "H1": H1_match_urls,
-            "L1": L1_match_urls,
-            "V1": V1_match_urls
-        }
+        n_sources = n_sources or get_sources_per_sample(n_samples=n_samples)
+        urls = catalog.coincident_segments(
+            run=run,
+            detectors=detectors,
+            gps_start=gps_start,
+            gps_end=gps_end,
+            min_duty_cycle=min_duty_cycle,
+            limit=n_sources
+        )
+        Logger.info(f"Sources matched collected: {len(urls[detectors[0]])}", verbose=False)
         return urls
 
     @staticmethod
-    def _get_gwosc_strain_urls(
+    def _get_gwosc_archive_page(
             detector: str,
-            run: str
-    ) -> List[str]:
-        url = f"https://gwosc.org/archive/links/{run}/{detector}/1256655618/1269363618/simple/"
+            run: str,
+            gps_start: int,
+            gps_end: int
+    ) -> str:
+        url = f"https://gwosc.org/archive/links/{run}/{detector}/{gps_start}/{gps_end}/simple/"
         Logger.info(f"Fetching GWOSC strain URLs for detector {detector} for run {run}")
         response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        table = soup.find('table')
-        rows = table.find_all('tr')
-
-        links = {}
-        for row in rows[1:]:
-            columns = row.find_all('td')
-            if columns[5].text.strip() == '100.0':
-                timeline = columns[0].text.strip()
-                link = 'https://gwosc.org' + columns[3].find('a')['href']
-                links[timeline] = link
-        return links
+        response.raise_for_status()
+        return response.text
@@ -0,0 +1,148 @@
+import os
+import re
+import time
+import sqlite3
+from contextlib import contextmanager
+from bs4 import BeautifulSoup
+from typing import Dict, Iterator, List, Tuple
+
+from core.utils.logger import Logger
+
+
+class GWOSCSegmentCatalog:
+    FILE_SPAN_PATTERN = re.compile(r"-(\d+)-(\d+)\.(?:hdf5|h5|gwf)$")
+    DEFAULT_FILE_DURATION: int = 4096
+
+    def __init__(self, path: str, ttl_hours: float = 24.0):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_schema()
+
+    def is_fresh(self, run: str, detector: str, gps_start: int, gps_end: int) -> bool:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT gps_start, gps_end, fetched_at FROM refreshes WHERE run = ? AND detector = ?",
+                (run, detector)
+            ).fetchone()
+        if row is None:
+            return False
+        covered = row[0] <= gps_start and row[1] >= gps_end
+        return covered and time.time() - row[2] < self.ttl_seconds
+
+    def ingest_html(
+        self,
+        run: str,
+        detector: str,
+        html: str,
+        gps_start: int,
+        gps_end: int
+    ) -> int:
+        segments = self._parse_archive_table(html)
+        fetched_at = time.time()
+
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM segments WHERE run = ? AND detector = ? AND gps_start BETWEEN ? AND ?",
+                (run, detector, gps_start, gps_end)
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO segments "
+                "(run, detector, gps_start, duration, duty_cycle, url) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run, detector, *segment) for segment in segments]
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO refreshes "
+                "(run, detector, gps_start, gps_end, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (run, detector, gps_start, gps_end, fetched_at)
+            )
+
+        Logger.info(f"Catalog refreshed with {len(segments)} segments for {detector} ({run})")
+        return len(segments)
+
+    def coincident_segments(
+        self,
+        run: str,
+        detectors: List[str],
+        gps_start: int,
+        gps_end: int,
+        min_duty_cycle: float = 100.0,
+        limit: int = None
+    ) -> Dict[str, List[str]]:
+        placeholders = ",".join("?" for _ in detectors)
+        query = (
+            "SELECT gps_start FROM segments "
+            f"WHERE run = ? AND detector IN ({placeholders}) "
+            "AND duty_cycle >= ? AND gps_start >= ? AND gps_start + duration <= ? "
+            "GROUP BY gps_start HAVING COUNT(DISTINCT detector) = ? "
+            "ORDER BY gps_start"
+        )
+        parameters = [run, *detectors, min_duty_cycle, gps_start, gps_end, len(detectors)]
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+
+        with self._connect() as connection:
+            starts = [row[0] for row in connection.execute(query, parameters)]
+            urls = {detector: [] for detector in detectors}
+            for start in starts:
+                for detector, url in connection.execute(
+                    f"SELECT detector, url FROM segments WHERE run = ? AND gps_start = ? AND detector IN ({placeholders})",
+                    (run, start, *detectors)
+                ):
+                    urls[detector].append(url)
+
+        return urls
+
+    def _parse_archive_table(self, html: str) -> List[Tuple[int, int, float, str]]:
+        soup = BeautifulSoup(html, 'html.parser')
+        table = soup.find('table')
+        if table is None:
+            Logger.warning("No segment table found in GWOSC archive page")
+            return []
+
+        segments = []
+        for row in table.find_all('tr')[1:]:
+            columns = row.find_all('td')
+            link = columns[3].find('a')
+            if link is None:
+                continue
+            url = 'https://gwosc.org' + link['href']
+            match = self.FILE_SPAN_PATTERN.search(url)
+            if match:
+                gps_start, duration = int(match.group(1)), int(match.group(2))
+            else:
+                gps_start, duration = int(float(columns[0].text.strip())), self.DEFAULT_FILE_DURATION
+            duty_cycle = float(columns[5].text.strip())
+            segments.append((gps_start, duration, duty_cycle, url))
+        return segments
+
+    def _create_schema(self) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                "run TEXT NOT NULL, detector TEXT NOT NULL, gps_start INTEGER NOT NULL, "
+                "duration INTEGER NOT NULL, duty_cycle REAL NOT NULL, url TEXT NOT NULL, "
+                "PRIMARY KEY (run, detector, gps_start))"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS segments_by_duty_cycle "
+                "ON segments (run, detector, duty_cycle, gps_start)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS refreshes ("
+                "run TEXT NOT NULL, detector TEXT NOT NULL, gps_start INTEGER NOT NULL, "
+                "gps_end INTEGER NOT NULL, fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (run, detector))"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
@@ -0,0 +1,199 @@
+import os
+import h5py
+import numpy as np
+from typing import Any, Dict, List, Set
+from numpy.typing import NDArray
+
+from core.types import WindowBatch
+from core.handlers.dataset_format import DatasetFormat
+from core.utils.h5_filters import dataset_filters, validate_dataset_options
+from core.utils.running_statistics import RunningStatistics
+
+
+class H5WindowWriter:
+    FIXED_WIDTH_COLUMNS = ("detectors",)
+
+    def __init__(
+        self,
+        path: str,
+        compression: str = "gzip",
+        compression_opts: int = 4,
+        time_format: str = "compact",
+        chunk_bytes: int = 1 << 20,
+        max_chunk_rows: int = 4096,
+        shuffle: bool = False,
+        dataset_options: Dict[str, Dict[str, Any]] = None
+    ):
+        validate_dataset_options(dataset_options)
+        self.path = path
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.time_format = time_format
+        self.chunk_bytes = chunk_bytes
+        self.max_chunk_rows = max_chunk_rows
+        self.shuffle = shuffle
+        self.dataset_options = dataset_options or dict()
+        self.n_rows = 0
+        self.n_points = None
+        self.delta_t = None
+        self.detectors: Set[str] = set()
+        self.file_indices: Set[int] = set()
+        self.models: Set[str] = set()
+        self.gps_starts = RunningStatistics()
+        self.snrs = RunningStatistics()
+        self.distances = RunningStatistics()
+        self._file = None
+        self._pending: Dict[str, List[NDArray]] = dict()
+        self._chunk_rows: Dict[str, int] = dict()
+
+    def __enter__(self) -> "H5WindowWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def append(self, batch: WindowBatch, **columns: NDArray) -> None:
+        if not len(batch):
+            return
+
+        if self.n_points is None:
+            self.n_points = batch.strains.shape[1]
+            self.delta_t = batch.delta_t
+        elif batch.delta_t != self.delta_t or batch.strains.shape[1] != self.n_points:
+            raise ValueError(f"Cannot append windows of a different shape or sample rate to {self.path}")
+
+        self.append_columns({
+            **DatasetFormat.time_datasets(batch, self.time_format),
+            'strains': batch.strains,
+            'sample_indices': batch.sample_indices,
+            'file_indices': batch.file_indices,
+            'detectors': batch.detectors,
+            'gps_starts': batch.gps_starts,
+            **columns
+        })
+        self._track(batch)
+
+    def append_columns(self, columns: Dict[str, NDArray]) -> None:
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = h5py.File(self.path, 'w')
+
+        for name, values in columns.items():
+            values = np.asarray(values)
+            if name not in self._chunk_rows:
+                self._chunk_rows[name] = self._target_chunk_rows(name, values)
+            if name in self._file:
+                dataset = self._file[name]
+                if dataset.dtype.kind == 'S' and values.dtype.itemsize > dataset.dtype.itemsize:
+                    raise ValueError(f"Values of {name} are longer than {dataset.dtype.itemsize} characters")
+            self._pending.setdefault(name, []).append(values)
+            if name in self._file or len(self._pending[name]) > 1:
+                self._flush(name)
+        self.n_rows += len(next(iter(columns.values())))
+
+    def write_attributes(self, attributes: Dict[str, Any]) -> None:
+        if self._file is None:
+            return
+        for key, value in attributes.items():
+            self._file.attrs[key] = value
+
+    def write_link(self, name: str, target_file: str, target_path: str = "/") -> None:
+        if self._file is None:
+            return
+        self._file[name] = h5py.ExternalLink(target_file, target_path)
+
+    def statistics(self) -> Dict[str, Any]:
+        if not self.n_rows:
+            return {}
+
+        window_duration = (self.n_points - 1) * self.delta_t
+        return {
+            'n_samples': self.n_rows,
+            'window_duration': window_duration,
+            'sampling_rate': self.n_points / window_duration,
+            'n_points_per_sample': self.n_points,
+            'detectors': ','.join(sorted(self.detectors)),
+            'n_files': len(self.file_indices),
+            'gps_start_min': self.gps_starts.minimum,
+            'gps_start_max': self.gps_starts.maximum,
+            'format_version': DatasetFormat.VERSION,
+            'time_format': self.time_format,
+            'delta_t': self.delta_t
+        }
+
+    def injection_statistics(self) -> Dict[str, Any]:
+        return {
+            'snr_min': self.snrs.minimum,
+            'snr_max': self.snrs.maximum,
+            'snr_mean': self.snrs.mean,
+            'snr_std': self.snrs.std,
+            'models': ','.join(sorted(self.models))
+        }
+
+    def close(self) -> None:
+        if self._file is not None:
+            for name in list(self._pending):
+                self._flush(name, final=True)
+            self._file.close()
+            self._file = None
+
+    def _flush(self, name: str, final: bool = False) -> None:
+        chunk_rows = self._chunk_rows[name]
+        pending = self._pending[name]
+        n_pending = sum(len(values) for values in pending)
+        n_write = n_pending if final else n_pending - n_pending % chunk_rows
+        if not n_write:
+            return
+
+        values = np.concatenate(pending) if len(pending) > 1 else pending[0]
+        if name not in self._file:
+            if final:
+                n_chunks = -(-n_write // chunk_rows)
+                chunk_rows = -(-n_write // n_chunks)
+            self._create_dataset(name, values, chunk_rows)
+        dataset = self._file[name]
+        start = dataset.shape[0]
+        dataset.resize(start + n_write, axis=0)
+        dataset[start:] = values[:n_write]
+        self._pending[name] = [values[n_write:].copy()] if n_write < n_pending else []
+
+    def _dtype(self, name: str, values: NDArray) -> np.dtype:
+        if values.dtype.kind in ('S', 'O') and name not in self.FIXED_WIDTH_COLUMNS:
+            return h5py.string_dtype('ascii')
+        return values.dtype
+
+    def _target_chunk_rows(self, name: str, values: NDArray) -> int:
+        options = self.dataset_options.get(name, dict())
+        row_bytes = np.dtype(self._dtype(name, values)).itemsize * int(np.prod(values.shape[1:], dtype=np.int64))
+        return options.get('chunk_rows') or int(np.clip(
+            options.get('chunk_bytes', self.chunk_bytes) // max(1, row_bytes),
+            1,
+            self.max_chunk_rows
+        ))
+
+    def _create_dataset(self, name: str, values: NDArray, chunk_rows: int) -> h5py.Dataset:
+        row_shape = values.shape[1:]
+        options = self.dataset_options.get(name, dict())
+        dtype = self._dtype(name, values)
+        return self._file.create_dataset(
+            name,
+            shape=(0, *row_shape),
+            maxshape=(None, *row_shape),
+            dtype=dtype,
+            chunks=(chunk_rows, *row_shape),
+            **dataset_filters(
+                options.get('compression', self.compression),
+                options.get('compression_opts', self.compression_opts),
+                options.get('shuffle', self.shuffle)
+            )
+        )
+
+    def _track(self, batch: WindowBatch) -> None:
+        self.detectors.update(batch.detector_names[code] for code in np.unique(batch.detector_codes))
+        self.file_indices.update(np.unique(batch.file_indices).tolist())
+        self.gps_starts.update(batch.gps_starts)
+        if batch.snrs is not None:
+            self.snrs.update(batch.snrs)
+            self.distances.update(batch.distances)
+        if batch.models is not None:
+            self.models.update(model.decode() for model in np.unique(batch.models) if model)
@@ -0,0 +1,116 @@
+import os
+import hashlib
+import tempfile
+import numpy as np
+from collections import OrderedDict
+from pycbc.types.frequencyseries import FrequencySeries
+from typing import Any, Callable, Dict, Optional
+
+from core.utils.logger import Logger
+
+
+class PSDCache:
+    def __init__(self, cache_dir: str = None, max_memory_entries: int = 256):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(
+        detector: str,
+        gps_start: float,
+        duration: float,
+        sample_rate: float,
+        seg_len: int,
+        seg_stride: int,
+        variant: str = "",
+        source_id: str = ""
+    ) -> str:
+        description = (
+            f"{source_id}|{detector}|{gps_start:.6f}|{duration:.6f}|{sample_rate:.6f}|"
+            f"{seg_len}|{seg_stride}|{variant}"
+        )
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[FrequencySeries]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        psd = self._read(key)
+        if psd is None:
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        self._remember(key, psd)
+        return psd
+
+    def put(self, key: str, psd: FrequencySeries) -> None:
+        self._remember(key, psd)
+        if self.cache_dir:
+            self._write(key, psd)
+
+    def get_or_compute(self, key: str, compute: Callable[[], FrequencySeries]) -> FrequencySeries:
+        psd = self.get(key)
+        if psd is None:
+            psd = compute()
+            self.put(key, psd)
+        return psd
+
+    def counters(self) -> Dict[str, int]:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+    def add_counters(self, counters: Dict[str, int]) -> None:
+        self.hits += counters["hits"]
+        self.disk_hits += counters["disk_hits"]
+        self.misses += counters["misses"]
+
+    def report(self) -> Dict[str, Any]:
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+            "memory_entries": len(self._memory)
+        }
+
+    def log_report(self) -> None:
+        report = self.report()
+        Logger.info(
+            f"PSD cache: {report['hits']} memory hits, {report['disk_hits']} disk hits, "
+            f"{report['misses']} misses ({report['hit_rate']:.0%} hit rate)"
+        )
+
+    def _remember(self, key: str, psd: FrequencySeries) -> None:
+        self._memory[key] = psd
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _read(self, key: str) -> Optional[FrequencySeries]:
+        if not self.cache_dir or not os.path.exists(self._path_for(key)):
+            return None
+        try:
+            with np.load(self._path_for(key)) as stored:
+                return FrequencySeries(stored["data"], delta_f=float(stored["delta_f"]), epoch=float(stored["epoch"]))
+        except (OSError, KeyError, ValueError) as e:
+            Logger.warning(f"Discarding unreadable PSD cache entry {key} ({e})")
+            os.remove(self._path_for(key))
+            return None
+
+    def _write(self, key: str, psd: FrequencySeries) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, data=psd.numpy(), delta_f=psd.delta_f, epoch=float(psd.epoch))
+        os.replace(temp_path, self._path_for(key))
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from typing import Dict, Optional, Any
+
+from core.utils.logger import Logger
+
+
+class StrainCache:
+    INDEX_FILE: str = "index.json"
+    HASH_BLOCK_SIZE: int = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size_gb: float = 50.0,
+        verify_checksum: bool = False
+    ):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_gb * 1024 ** 3)
+        self.verify_checksum = verify_checksum
+        self.hits = 0
+        self.misses = 0
+        self._in_use = set()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index = self._read_index()
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def checksum(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(StrainCache.HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def path_for(self, url: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.key_for(url)}.hdf5")
+
+    def get(self, url: str) -> Optional[str]:
+        key = self.key_for(url)
+        entry = self._index.get(key)
+        path = self.path_for(url)
+
+        if entry is None or not self._is_valid(entry, path):
+            if entry is not None:
+                Logger.warning(f"Discarding invalid cache entry for {url}")
+                self._remove(key)
+            self.misses += 1
+            return None
+
+        entry["last_access"] = time.time()
+        self._in_use.add(key)
+        self._write_index()
+        self.hits += 1
+        Logger.info(f"Cache hit for {url}", verbose=False)
+        return path
+
+    def put(self, url: str, source_path: str, checksum: str = None) -> str:
+        key = self.key_for(url)
+        path = self.path_for(url)
+        size = os.path.getsize(source_path)
+
+        self._evict(required_bytes=size, keep=key)
+        os.replace(source_path, path)
+        self._in_use.add(key)
+
+        self._index[key] = {
+            "url": url,
+            "size": size,
+            "checksum": checksum or self.checksum(path),
+            "last_access": time.time()
+        }
+        self._write_index()
+        return path
+
+    def partial_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.key_for(url)}.part")
+
+    def size_bytes(self) -> int:
+        return sum(entry["size"] for entry in self._index.values())
+
+    def report(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._index),
+            "size_mb": self.size_bytes() / 1024 / 1024
+        }
+
+    def log_report(self) -> None:
+        report = self.report()
+        Logger.info(
+            f"Strain cache: {report['hits']} hits, {report['misses']} misses "
+            f"({report['hit_rate']:.0%} hit rate), {report['entries']} files, "
+            f"{report['size_mb']:.2f} MB"
+        )
+
+    def _is_valid(self, entry: Dict[str, Any], path: str) -> bool:
+        if not os.path.exists(path) or os.path.getsize(path) != entry["size"]:
+            return False
+        if self.verify_checksum:
+            return self.checksum(path) == entry["checksum"]
+        return True
+
+    def _evict(self, required_bytes: int, keep: str = None) -> None:
+        by_last_access = sorted(
+            (key for key in self._index if key != keep and key not in self._in_use),
+            key=lambda key: self._index[key]["last_access"]
+        )
+        current_size = self.size_bytes()
+        for key in by_last_access:
+            if current_size + required_bytes <= self.max_size_bytes:
+                break
+            current_size -= self._index[key]["size"]
+            Logger.info(f"Evicting cached file {self._index[key]['url']}", verbose=False)
+            self._remove(key)
+
+        if current_size + required_bytes > self.max_size_bytes:
+            Logger.warning(
+                f"Strain cache exceeds its {self.max_size_bytes / 1024 ** 3:.2f} GB limit "
+                "with files used by the current run"
+            )
+
+    def _remove(self, key: str) -> None:
+        entry = self._index.pop(key, None)
+        path = os.path.join(self.cache_dir, f"{key}.hdf5")
+        if os.path.exists(path):
+            os.remove(path)
+        if entry is not None:
+            self._write_index()
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {}
+        try:
+            with open(index_path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            Logger.warning(f"Strain cache index unreadable ({e}), starting empty")
+            return {}
+
+    def _write_index(self) -> None:
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, index_path)
@@ -0,0 +1,163 @@
+import asyncio
+import base64
+import hashlib
+import os
+import aiohttp
+from typing import Dict, List, Optional
+
+from core.handlers.strain_cache import StrainCache
+from core.utils.logger import Logger
+
+
+class StrainDownloader:
+    HDF5_SIGNATURE: bytes = b"\x89HDF\r\n\x1a\n"
+
+    def __init__(
+        self,
+        cache: StrainCache,
+        max_concurrent_downloads: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        timeout_seconds: float = 600.0,
+        chunk_size_mb: float = 8.0
+    ):
+        self.cache = cache
+        self.max_concurrent_downloads = max_concurrent_downloads
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout_seconds = timeout_seconds
+        self.chunk_size = int(chunk_size_mb * 1024 * 1024)
+
+    def download(self, urls: List[str]) -> Dict[str, str]:
+        paths = {}
+        pending = []
+        for url in dict.fromkeys(urls):
+            cached = self.cache.get(url)
+            if cached is not None:
+                paths[url] = cached
+            else:
+                pending.append(url)
+
+        if pending:
+            Logger.info(
+                f"Downloading {len(pending)} files with up to "
+                f"{self.max_concurrent_downloads} concurrent connections"
+            )
+            paths.update(asyncio.run(self._download_all(pending)))
+
+        return paths
+
+    async def _download_all(self, urls: List[str]) -> Dict[str, str]:
+        semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrent_downloads)
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=self.timeout_seconds)
+        progress = {"completed": 0, "total": len(urls)}
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            tasks = [
+                self._download_with_retries(session, semaphore, url, progress)
+                for url in urls
+            ]
+            results = await asyncio.gather(*tasks)
+
+        return dict(zip(urls, results))
+
+    async def _download_with_retries(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        url: str,
+        progress: Dict[str, int]
+    ) -> str:
+        async with semaphore:
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    path = await self._download_file(session, url)
+                    progress["completed"] += 1
+                    Logger.info(
+                        f"Downloaded file {progress['completed']}/{progress['total']}: {url}"
+                    )
+                    return path
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    if attempt == self.max_retries:
+                        Logger.error(f"Failed to download {url} after {attempt} attempts: {e}")
+                        raise
+                    delay = self.retry_backoff * 2 ** (attempt - 1)
+                    Logger.warning(
+                        f"Download of {url} failed ({e}), retrying in {delay:.1f}s "
+                        f"(attempt {attempt}/{self.max_retries})"
+                    )
+                    await asyncio.sleep(delay)
+
+    async def _download_file(self, session: aiohttp.ClientSession, url: str) -> str:
+        partial_file = self.cache.partial_path(url)
+        offset = os.path.getsize(partial_file) if os.path.exists(partial_file) else 0
+        hasher = hashlib.sha256()
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        Logger.info(f"Downloading file from URL: {url}", verbose=False)
+        async with session.get(url, headers=headers) as response:
+            if response.status == 416:
+                if offset == self._total_size_from_range(response.headers.get("Content-Range")):
+                    Logger.info(f"Partial file of {url} is already complete", verbose=False)
+                    await asyncio.to_thread(self._hash_existing, partial_file, hasher)
+                    await asyncio.to_thread(self._verify, partial_file, offset, None)
+                    return self.cache.put(url, partial_file, hasher.hexdigest())
+                Logger.warning(f"Server rejected resume of {url}, restarting download")
+                os.remove(partial_file)
+                return await self._download_file(session, url)
+            response.raise_for_status()
+
+            if response.status == 206:
+                Logger.info(f"Resuming {url} from byte {offset}", verbose=False)
+                await asyncio.to_thread(self._hash_existing, partial_file, hasher)
+                expected_size = self._total_size_from_range(response.headers.get("Content-Range"))
+                mode = "ab"
+            else:
+                offset = 0
+                expected_size = response.content_length
+                mode = "wb"
+
+            with open(partial_file, mode) as local_f:
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    await asyncio.to_thread(self._write_chunk, local_f, hasher, chunk)
+
+            content_md5 = response.headers.get("Content-MD5")
+
+        await asyncio.to_thread(self._verify, partial_file, expected_size, content_md5)
+        return self.cache.put(url, partial_file, hasher.hexdigest())
+
+    def _verify(self, path: str, expected_size: Optional[int], content_md5: Optional[str]) -> None:
+        size = os.path.getsize(path)
+        if expected_size is not None and size != expected_size:
+            raise OSError(f"Incomplete download: got {size} of {expected_size} bytes")
+
+        with open(path, "rb") as f:
+            if f.read(len(self.HDF5_SIGNATURE)) != self.HDF5_SIGNATURE:
+                os.remove(path)
+                raise OSError(f"Downloaded file {path} is not a valid HDF5 file")
+
+        if content_md5 is not None:
+            md5 = hashlib.md5()
+            self._hash_existing(path, md5)
+            if base64.b64encode(md5.digest()).decode() != content_md5:
+                os.remove(path)
+                raise OSError(f"Checksum mismatch for downloaded file {path}")
+
+    @staticmethod
+    def _write_chunk(local_f, hasher, chunk: bytes) -> None:
+        local_f.write(chunk)
+        hasher.update(chunk)
+
+    @staticmethod
+    def _hash_existing(path: str, hasher) -> None:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(StrainCache.HASH_BLOCK_SIZE), b""):
+                hasher.update(block)
+
+    @staticmethod
+    def _total_size_from_range(content_range: Optional[str]) -> Optional[int]:
+        if content_range is None or "/" not in content_range:
+            return None
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
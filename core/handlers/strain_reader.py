@@ -0,0 +1,63 @@
+import os
+import h5py
+import numpy as np
+
+from core.types.custom_types import GWOSCFileData, StrainSpan
+from core.utils.lazy_strain import LazyStrain, span_to_indices
+from core.utils.logger import Logger
+
+
+class StrainReader:
+
+    @staticmethod
+    def read_hdf5(path: str, span: StrainSpan = None, lazy: bool = True, source_id: str = None) -> GWOSCFileData:
+        Logger.info(f"Reading strain file: {path}", verbose=False)
+        with h5py.File(path, "r") as file:
+            delta_t = file['strain']['Strain'].attrs['Xspacing']
+            time_sampling = file['strain']['Strain'].attrs['Xspacing']
+            meta = file['meta']
+            gps_start = meta['GPSstart'][()]
+            duration = meta['Duration'][()]
+            start, stop = span_to_indices(span, file['strain']['Strain'].shape[0], delta_t)
+
+            if lazy:
+                strain = LazyStrain(path, start=start, stop=stop)
+            else:
+                strain = file['strain']['Strain'][start:stop]
+
+        if span is not None:
+            Logger.info(f"Reading samples [{start}, {stop}) of {path}", verbose=False)
+
+        return {
+            "strain": strain,
+            "gps_start": gps_start,
+            "duration": duration,
+            "time_sampling": time_sampling,
+            "delta_t": delta_t,
+            "offset": start,
+            "source_id": source_id or StrainReader.file_identity(path)
+        }
+
+    @staticmethod
+    def read_gwf(path: str, channel: str, span: StrainSpan = None, source_id: str = None) -> GWOSCFileData:
+        from pycbc.frame import read_frame
+
+        Logger.info(f"Reading frame file: {path} ({channel})", verbose=False)
+        timeseries = read_frame(path, channel)
+        delta_t = float(timeseries.delta_t)
+        start, stop = span_to_indices(span, len(timeseries), delta_t)
+
+        return {
+            "strain": np.array(timeseries.numpy()[start:stop]),
+            "gps_start": float(timeseries.start_time),
+            "duration": float(timeseries.duration),
+            "time_sampling": delta_t,
+            "delta_t": delta_t,
+            "offset": start,
+            "source_id": source_id or f"{StrainReader.file_identity(path)}|{channel}"
+        }
+
+    @staticmethod
+    def file_identity(path: str) -> str:
+        stat = os.stat(path)
+        return f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}"
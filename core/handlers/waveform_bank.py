@@ -0,0 +1,140 @@
+import os
+import glob
+import hashlib
+import tempfile
+import numpy as np
+from typing import Dict, List, Tuple
+from numpy.typing import NDArray
+
+from core.strategies.loader.waveform_loader import WaveformLoader
+from core.types.custom_types import WaveformData
+from core.utils.logger import Logger
+from core.utils.waveform_procesor import resample_waveform, waveform_to_dimensionless
+
+
+class WaveformBank:
+    EXTENSIONS = (".h5", ".hdf5")
+    HASH_BLOCK_SIZE: int = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        source: str = None,
+        cache_dir: str = ".cache/templates",
+        waveforms: Dict[str, WaveformData] = None
+    ):
+        self.source = source
+        self.cache_dir = cache_dir
+        self.paths = self._resolve(source) if source else {}
+        self._waveforms = dict(waveforms or {})
+        self._templates = dict()
+        self._hashes = dict()
+        self.hits = 0
+        self.misses = 0
+        if self.cache_dir and self.paths:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        if not self.models:
+            raise ValueError(f"No waveform models found for {source}")
+
+    @property
+    def models(self) -> List[str]:
+        return list(self.paths) + [model for model in self._waveforms if model not in self.paths]
+
+    def waveform(self, model: str) -> WaveformData:
+        if model not in self._waveforms:
+            self._waveforms[model] = WaveformLoader(waveform_path=self.paths[model]).load()
+        return self._waveforms[model]
+
+    def duration(self, model: str) -> float:
+        time = self.waveform(model)["time"]
+        return time[-1] - time[0]
+
+    def template(
+        self,
+        model: str,
+        polarization: str,
+        sampling_frequency: float
+    ) -> Tuple[NDArray[np.float64], NDArray[np.float64]]:
+        key = (model, polarization, float(sampling_frequency))
+        if key in self._templates:
+            return self._templates[key]
+
+        path = self._template_path(model, polarization, sampling_frequency)
+        if path is not None and os.path.exists(path):
+            with np.load(path) as stored:
+                template = (stored["time"], stored["strain"])
+            self.hits += 1
+            Logger.info(f"Template cache hit for {model} at {sampling_frequency} Hz", verbose=False)
+        else:
+            template = self._resample(model, polarization, sampling_frequency)
+            self.misses += 1
+            if path is not None:
+                self._write(path, template)
+
+        self._templates[key] = template
+        return template
+
+    def source_hash(self, model: str) -> str:
+        if model not in self._hashes:
+            digest = hashlib.sha256()
+            with open(self.paths[model], "rb") as f:
+                for block in iter(lambda: f.read(WaveformBank.HASH_BLOCK_SIZE), b""):
+                    digest.update(block)
+            self._hashes[model] = digest.hexdigest()
+        return self._hashes[model]
+
+    def log_report(self) -> None:
+        Logger.info(
+            f"Waveform bank: {len(self.models)} models, "
+            f"{self.hits} cached templates, {self.misses} resampled"
+        )
+
+    def _resample(
+        self,
+        model: str,
+        polarization: str,
+        sampling_frequency: float
+    ) -> Tuple[NDArray[np.float64], NDArray[np.float64]]:
+        Logger.info(f"Resampling {model} ({polarization}) to {sampling_frequency} Hz")
+        waveform_data = self.waveform(model)
+        time, strain = resample_waveform(
+            waveform_data["time"],
+            waveform_to_dimensionless(waveform_data[polarization]),
+            sampling_frequency
+        )
+        if strain is None:
+            raise ValueError(f"Failed to resample waveform {model} to {sampling_frequency} Hz")
+        return time, strain
+
+    def _template_path(self, model: str, polarization: str, sampling_frequency: float) -> str:
+        if not self.cache_dir or model not in self.paths:
+            return None
+        return os.path.join(
+            self.cache_dir,
+            f"{self.source_hash(model)}_{polarization}_{sampling_frequency:g}.npz"
+        )
+
+    def _write(self, path: str, template: Tuple[NDArray[np.float64], NDArray[np.float64]]) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, time=template[0], strain=template[1])
+        os.replace(temp_path, path)
+
+    def _resolve(self, source: str) -> Dict[str, str]:
+        if os.path.isdir(source):
+            paths = [
+                os.path.join(source, file_name)
+                for file_name in os.listdir(source)
+                if file_name.endswith(self.EXTENSIONS)
+            ]
+        elif glob.has_magic(source):
+            paths = glob.glob(source)
+        else:
+            paths = [source]
+
+        models = dict()
+        for path in sorted(paths):
+            name = os.path.splitext(os.path.basename(path))[0]
+            if name in models:
+                name = os.path.splitext(os.path.relpath(path))[0]
+            models[name] = path
+        return models
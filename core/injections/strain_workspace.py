@@ -0,0 +1,16 @@
+import numpy as np
+from typing import Any, Dict
+from numpy.typing import NDArray
+
+
+class StrainWorkspace:
+    def __init__(self):
+        self._buffer = None
+
+    def buffer(self, length: int) -> NDArray[np.float64]:
+        if self._buffer is None or len(self._buffer) < length:
+            self._buffer = np.empty(length, dtype=np.float64)
+        return self._buffer[:length]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"_buffer": None}
@@ -1,10 +1,14 @@
+import hashlib
 import numpy as np
 from pycbc.types import TimeSeries
 from pycbc.filter import sigma
 from pycbc.psd import welch, interpolate
-from typing import List, Tuple
+from pycbc.psd.estimate import median_bias
+from pycbc.filter.matchedfilter import get_cutoff_indices
+from typing import Dict, List, Tuple
 from numpy.typing import NDArray
 
+from core.handlers.psd_cache import PSDCache
 from core.types.custom_types import InjectionInfo
 from core.utils.logger import Logger
 
@@ -12,6 +16,12 @@ from core.utils.logger import Logger
 class WaveformInjector:
 
     SNR_CALCULATION_WINDOW_SECONDS: float = 4.0
+    SNR_PSD_SEGMENT_SECONDS: float = 4.0
+    SNR_PSD_STRIDE_SECONDS: float = 2.0
+    SNR_LOW_FREQUENCY_CUTOFF: float = 1.0
+    SNR_BATCH_SIZE: int = 256
+    SNR_METHODS = ("legacy", "batch")
+    INJECTION_BATCH_SIZE: int = 256
 
     @staticmethod
     def inject_waveforms(
@@ -21,35 +31,79 @@ class WaveformInjector:
         sampling_frequency: float,
         sample_duration_seconds: float,
         n_injections: int = None,
-        use_first_half: bool = True
+        use_first_half: bool = True,
+        sample_offset: int = 0,
+        total_length: int = None,
+        psd_cache: PSDCache = None,
+        detector: str = None,
+        gps_start: float = None,
+        source_id: str = None,
+        snr_method: str = "legacy",
+        out: NDArray[np.float64] = None,
+        amplitudes: NDArray[np.float64] = None
     ) -> Tuple[NDArray[np.float64], List[InjectionInfo]]:
+        if snr_method not in WaveformInjector.SNR_METHODS:
+            raise ValueError(f"snr_method must be one of {WaveformInjector.SNR_METHODS}, got {snr_method}")
 
         if use_first_half:
             Logger.warning("Using only first half of strain for injections")
         else:
             Logger.warning("Using entire strain for injections")
 
-        strain_injected = np.copy(strain_noise)
-        injection_positions = WaveformInjector._calculate_injection_positions(
+        if out is None:
+            strain_injected = np.copy(strain_noise)
+        else:
+            strain_injected = out[:len(strain_noise)]
+            np.copyto(strain_injected, strain_noise)
+
+        injection_positions = WaveformInjector.injection_positions(
             strain_length=len(strain_noise),
+            waveform_length=len(waveform),
             injection_interval_seconds=injection_interval_seconds,
             sampling_frequency=sampling_frequency,
-            use_first_half=use_first_half
+            n_injections=n_injections,
+            use_first_half=use_first_half,
+            sample_offset=sample_offset,
+            total_length=total_length
         )
 
-        if n_injections is not None:
-            injection_positions = injection_positions[:n_injections]
-
         if len(injection_positions) == 0:
             Logger.info("No injections performed due to insufficient strain length")
             return strain_injected, []
 
+        if amplitudes is None:
+            amplitudes = np.ones(len(injection_positions))
+        else:
+            amplitudes = np.asarray(amplitudes, dtype=np.float64)[:len(injection_positions)]
+
         half_window_samples = int((WaveformInjector.SNR_CALCULATION_WINDOW_SECONDS / sample_duration_seconds) * 0.5)
+        waveform_duration_seconds = len(waveform) * sample_duration_seconds
 
         Logger.info(f"First injection at sample: {injection_positions[0]}", verbose=False)
         Logger.info(f"Number of injections to perform: {len(injection_positions)}")
 
+        if snr_method == "batch":
+            local_positions = injection_positions - sample_offset
+            snrs = WaveformInjector.calculate_snr_batch(
+                waveform=waveform,
+                strain=strain_noise,
+                injection_indices=local_positions,
+                sample_duration_seconds=sample_duration_seconds
+            ) * np.abs(amplitudes)
+            WaveformInjector.add_injections(strain_injected, waveform, local_positions, amplitudes)
+
+            Logger.info(f"Completed {len(injection_positions)} injections")
+            return strain_injected, [
+                {
+                    "time_inj": sample_index / sampling_frequency,
+                    "snr": float(snr),
+                    "waveform_duration": waveform_duration_seconds
+                }
+                for sample_index, snr in zip(injection_positions, snrs)
+            ]
+
         injection_log: List[InjectionInfo] = []
+        waveform_digest = hashlib.sha256(waveform.tobytes()).hexdigest()
 
         for idx, sample_index in enumerate(injection_positions):
             Logger.info(f"Injection No. {idx + 1}", verbose=False)
@@ -57,22 +111,28 @@ class WaveformInjector:
             injection_time_seconds = sample_index / sampling_frequency
             Logger.info(f"Time injection: {injection_time_seconds:.4f}s", verbose=False)
 
-            start_index = sample_index
-            end_index = sample_index + len(waveform)
-            strain_injected[start_index:end_index] += waveform
+            injected_waveform = waveform if amplitudes[idx] == 1.0 else waveform * amplitudes[idx]
+            snr_variant = f"snr|{waveform_digest}|{injection_interval_seconds}|{amplitudes[idx]}"
+
+            start_index = sample_index - sample_offset
+            end_index = start_index + len(waveform)
+            strain_injected[start_index:end_index] += injected_waveform
 
             snr = WaveformInjector._compute_injection_snr(
                 strain_injected=strain_injected,
-                waveform=waveform,
-                injection_sample_index=sample_index,
+                waveform=injected_waveform,
+                injection_sample_index=start_index,
                 half_window_samples=half_window_samples,
-                sample_duration_seconds=sample_duration_seconds
+                sample_duration_seconds=sample_duration_seconds,
+                psd_cache=psd_cache,
+                detector=detector,
+                gps_start=None if gps_start is None else gps_start + sample_offset * sample_duration_seconds,
+                source_id=source_id,
+                variant=snr_variant
             )
 
             Logger.info(f"Injection SNR value: {snr:.4f}", verbose=False)
 
-            waveform_duration_seconds = len(waveform) * sample_duration_seconds
-
             injection_log.append({
                 "time_inj": injection_time_seconds,
                 "snr": snr,
@@ -83,6 +143,59 @@ class WaveformInjector:
 
         return strain_injected, injection_log
 
+    @staticmethod
+    def injection_positions(
+        strain_length: int,
+        waveform_length: int,
+        injection_interval_seconds: float,
+        sampling_frequency: float,
+        n_injections: int = None,
+        use_first_half: bool = True,
+        sample_offset: int = 0,
+        total_length: int = None
+    ) -> NDArray[np.int64]:
+        injection_positions = WaveformInjector._calculate_injection_positions(
+            strain_length=total_length or strain_length,
+            injection_interval_seconds=injection_interval_seconds,
+            sampling_frequency=sampling_frequency,
+            use_first_half=use_first_half
+        )
+        injection_positions = injection_positions[
+            (injection_positions >= sample_offset)
+            & (injection_positions + waveform_length <= sample_offset + strain_length)
+        ]
+
+        if n_injections is not None:
+            injection_positions = injection_positions[:n_injections]
+        return injection_positions
+
+    @staticmethod
+    def add_injections(
+        strain: NDArray[np.float64],
+        waveform: NDArray[np.float64],
+        injection_indices: NDArray[np.int64],
+        amplitudes: NDArray[np.float64] = None
+    ) -> None:
+        injection_indices = np.asarray(injection_indices, dtype=np.int64)
+        if len(injection_indices) == 0:
+            return
+        amplitudes = np.ones(len(injection_indices)) if amplitudes is None else np.asarray(amplitudes, dtype=np.float64)
+
+        order = np.argsort(injection_indices, kind="stable")
+        spacing = int(np.min(np.diff(injection_indices[order]))) if len(order) > 1 else len(waveform)
+        if spacing <= 0:
+            offsets = injection_indices[:, None] + np.arange(len(waveform))
+            np.add.at(strain, offsets, amplitudes[:, None] * waveform)
+            return
+
+        n_combs = -(-len(waveform) // spacing)
+        for comb in range(n_combs):
+            members = order[comb::n_combs]
+            for batch_start in range(0, len(members), WaveformInjector.INJECTION_BATCH_SIZE):
+                batch = members[batch_start:batch_start + WaveformInjector.INJECTION_BATCH_SIZE]
+                offsets = injection_indices[batch][:, None] + np.arange(len(waveform))
+                strain[offsets] += amplitudes[batch][:, None] * waveform
+
     @staticmethod
     def _calculate_injection_positions(
         strain_length: int,
@@ -113,7 +226,12 @@ class WaveformInjector:
         waveform: NDArray[np.float64],
         injection_sample_index: int,
         half_window_samples: int,
-        sample_duration_seconds: float
+        sample_duration_seconds: float,
+        psd_cache: PSDCache = None,
+        detector: str = None,
+        gps_start: float = None,
+        source_id: str = None,
+        variant: str = "snr"
     ) -> float:
         left_limit = max(0, injection_sample_index - half_window_samples)
         right_limit = injection_sample_index + len(waveform) + half_window_samples
@@ -122,14 +240,24 @@ class WaveformInjector:
         return WaveformInjector.calculate_snr(
             waveform=waveform,
             noise_segment=noise_segment_with_signal,
-            sample_duration_seconds=sample_duration_seconds
+            sample_duration_seconds=sample_duration_seconds,
+            psd_cache=psd_cache,
+            detector=detector,
+            gps_start=None if gps_start is None else gps_start + left_limit * sample_duration_seconds,
+            source_id=source_id,
+            variant=variant
         )
 
     @staticmethod
     def calculate_snr(
         waveform: NDArray[np.float64],
         noise_segment: NDArray[np.float64],
-        sample_duration_seconds: float
+        sample_duration_seconds: float,
+        psd_cache: PSDCache = None,
+        detector: str = None,
+        gps_start: float = None,
+        source_id: str = None,
+        variant: str = "snr"
     ) -> float:
         if len(noise_segment) < len(waveform):
             Logger.warning(f"waveform lenght: {len(waveform)}> noise_segment: {len(noise_segment)}")
@@ -146,9 +274,98 @@ class WaveformInjector:
         if len(noise_timeseries) < segment_length:
             return 0.0
 
-        psd = welch(noise_timeseries, seg_len=segment_length, seg_stride=segment_stride)
+        def estimate():
+            return welch(noise_timeseries, seg_len=segment_length, seg_stride=segment_stride)
+
+        if psd_cache is None or detector is None or gps_start is None or source_id is None:
+            psd = estimate()
+        else:
+            key = psd_cache.key_for(
+                detector,
+                gps_start,
+                len(noise_timeseries) * sample_duration_seconds,
+                sampling_frequency,
+                segment_length,
+                segment_stride,
+                variant=variant,
+                source_id=source_id
+            )
+            psd = psd_cache.get_or_compute(key, estimate)
         delta_f = 1.0 / len(waveform_timeseries) * sampling_frequency
         psd = interpolate(psd, delta_f)
 
         snr_value = sigma(waveform_timeseries, psd=psd, low_frequency_cutoff=1.0)
         return float(snr_value)
+
+    @staticmethod
+    def calculate_snr_batch(
+        waveform: NDArray[np.float64],
+        strain: NDArray[np.float64],
+        injection_indices: NDArray[np.int64],
+        sample_duration_seconds: float
+    ) -> NDArray[np.float64]:
+        injection_indices = np.asarray(injection_indices, dtype=np.int64)
+        snrs = np.zeros(len(injection_indices))
+        if len(injection_indices) == 0:
+            return snrs
+
+        sampling_frequency = 1.0 / sample_duration_seconds
+        segment_length = int(WaveformInjector.SNR_PSD_SEGMENT_SECONDS * sampling_frequency)
+        segment_stride = int(WaveformInjector.SNR_PSD_STRIDE_SECONDS * sampling_frequency)
+        half_window_samples = int((WaveformInjector.SNR_CALCULATION_WINDOW_SECONDS / sample_duration_seconds) * 0.5)
+
+        waveform_tilde = TimeSeries(waveform, delta_t=sample_duration_seconds).to_frequencyseries()
+        kmin, kmax = get_cutoff_indices(
+            WaveformInjector.SNR_LOW_FREQUENCY_CUTOFF,
+            None,
+            waveform_tilde.delta_f,
+            (len(waveform_tilde) - 1) * 2
+        )
+        waveform_power = np.abs(waveform_tilde.numpy()[kmin:kmax])**2
+
+        window = np.hanning(segment_length)
+        segment_delta_f = sampling_frequency / segment_length
+        normalization = 2 * segment_delta_f * segment_length / (window * window).sum() * sample_duration_seconds**2
+        position = np.arange(kmin, kmax) * waveform_tilde.delta_f / segment_delta_f
+        lower = np.minimum(np.floor(position).astype(np.int64), segment_length // 2)
+        upper = np.minimum(lower + 1, segment_length // 2)
+        fraction = position - lower
+
+        left_limits = np.maximum(0, injection_indices - half_window_samples)
+        right_limits = np.minimum(len(strain), injection_indices + len(waveform) + half_window_samples)
+        windows = np.lib.stride_tricks.sliding_window_view(strain, segment_length)
+
+        for length in np.unique(right_limits - left_limits):
+            group = np.flatnonzero(right_limits - left_limits == length)
+            if length < max(segment_length, len(waveform)):
+                continue
+
+            n_segments = int(length // segment_stride)
+            if (n_segments - 1) * segment_stride + segment_length > length:
+                n_segments -= 1
+            surplus = length - ((n_segments - 1) * segment_stride + segment_length)
+            first_segment = surplus // 2 + surplus % 2
+            segment_offsets = first_segment + np.arange(n_segments) * segment_stride
+
+            for batch_start in range(0, len(group), WaveformInjector.SNR_BATCH_SIZE):
+                batch = group[batch_start:batch_start + WaveformInjector.SNR_BATCH_SIZE]
+                segments = windows[left_limits[batch][:, None] + segment_offsets[None, :]]
+                segment_psds = np.abs(np.fft.rfft(segments * window, axis=-1))**2
+                segment_psds[..., 0] /= 2
+                segment_psds[..., -1] /= 2
+                psds = np.median(segment_psds, axis=1) / median_bias(n_segments) * normalization
+
+                interpolated = psds[:, lower] * (1 - fraction) + psds[:, upper] * fraction
+                sigma_squared = 4.0 * waveform_tilde.delta_f * np.sum(waveform_power / interpolated, axis=1)
+                snrs[batch] = np.sqrt(sigma_squared)
+
+        return snrs
+
+    @staticmethod
+    def snr_by_distance(
+        reference_snrs: NDArray[np.float64],
+        reference_distance: float,
+        distances: List[float]
+    ) -> Dict[float, NDArray[np.float64]]:
+        reference_snrs = np.asarray(reference_snrs, dtype=np.float64)
+        return {distance: reference_snrs * (reference_distance / distance) for distance in distances}
@@ -1,7 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Iterable
+
+from core.utils.streaming import merge_batches
 
 class ExporterBase(ABC):
     @abstractmethod
     def export(self, data: Any, destination: str, **kwargs) -> None:
         pass
+
+    def export_stream(self, batches: Iterable[Any], destination: str, **kwargs) -> None:
+        self.export(merge_batches(batches), destination, **kwargs)
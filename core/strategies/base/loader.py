@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Iterator
 
 class LoaderBase(ABC):
     @abstractmethod
     def load(self, **kwargs) -> Any:
         pass
+
+    def stream(self, **kwargs) -> Iterator[Any]:
+        yield self.load(**kwargs)
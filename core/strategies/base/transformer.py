@@ -1,7 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Dict, Iterable, Iterator
+
+from core.utils.streaming import merge_units
 
 class TransformerBase(ABC):
     @abstractmethod
     def transform(self, data: Any, **kwargs) -> Any:
         pass
+
+    def transform_stream(self, units: Iterable[Any], **kwargs) -> Iterator[Any]:
+        yield self.transform(merge_units(units), **kwargs)
+
+    def loading_hints(self) -> Dict[str, Any]:
+        return {}
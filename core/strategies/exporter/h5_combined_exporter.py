@@ -0,0 +1,133 @@
+import os
+import numpy as np
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, List
+
+from core.strategies.base.exporter import ExporterBase
+from core.types import CombinedTransformerData, WindowBatch
+from core.handlers.h5_window_writer import H5WindowWriter
+from core.utils.h5_filters import dataset_filters, validate_dataset_options
+from core.utils.logger import Logger
+
+@dataclass
+class H5CombinedExporter(ExporterBase):
+    compression: str = "gzip"
+    compression_opts: int = 4
+    file_name_template: str = "gw_combined_{group}"
+    noise_key: str = "noise"
+    duplicate_noise: bool = False
+    time_format: str = "compact"
+    chunk_bytes: int = 1 << 20
+    shuffle: bool = False
+    dataset_options: Dict[str, Dict[str, Any]] = None
+
+    def __post_init__(self):
+        dataset_filters(self.compression, self.compression_opts, self.shuffle)
+        validate_dataset_options(self.dataset_options)
+
+    def export(self, data: CombinedTransformerData, destination: str, **kwargs) -> None:
+        self.export_stream([data], destination, **kwargs)
+
+    def export_stream(self, batches: Iterable[CombinedTransformerData], destination: str, **kwargs) -> None:
+        os.makedirs(destination, exist_ok=True)
+        writers: Dict[Any, H5WindowWriter] = dict()
+        counts: Dict[Any, List[int]] = dict()
+
+        with ExitStack() as stack:
+            noise_writer = stack.enter_context(self._writer(self._output_file(destination, self.noise_key)))
+            for data in batches:
+                noise_samples = WindowBatch.from_samples(data.get(self.noise_key, []))
+                if not self.duplicate_noise:
+                    self._append(noise_writer, noise_samples, WindowBatch.empty())
+
+                for group, injection_samples in data.items():
+                    if group == self.noise_key:
+                        continue
+                    if group not in writers:
+                        writers[group] = stack.enter_context(self._writer(self._output_file(destination, group)))
+                        counts[group] = [0, 0]
+
+                    injection_samples = WindowBatch.from_samples(injection_samples)
+                    group_noise = noise_samples if self.duplicate_noise else WindowBatch.empty()
+                    self._append(writers[group], group_noise, injection_samples)
+                    counts[group][0] += len(group_noise)
+                    counts[group][1] += len(injection_samples)
+
+            noise_writer.write_attributes(self._extract_metadata(noise_writer, noise_writer.n_rows, 0, self.noise_key))
+            for group, writer in writers.items():
+                metadata = self._extract_metadata(writer, *counts[group], group)
+                if not self.duplicate_noise and noise_writer.n_rows:
+                    writer.write_link(self.noise_key, os.path.basename(noise_writer.path))
+                    metadata.update({
+                        'n_noise_samples': noise_writer.n_rows,
+                        'noise_file': os.path.basename(noise_writer.path)
+                    })
+                writer.write_attributes(metadata)
+
+        if noise_writer.n_rows:
+            Logger.info(f"Exported {noise_writer.n_rows} shared noise samples to HDF5.")
+            Logger.info(f"Dataset saved to: {noise_writer.path}")
+        for group, writer in writers.items():
+            if not writer.n_rows:
+                Logger.warning(f"No samples for {group}, skipping")
+                continue
+            Logger.info(
+                f"Exported {counts[group][0]} noise and {counts[group][1]} injection samples "
+                f"for {group} to HDF5."
+            )
+            Logger.info(f"Dataset saved to: {writer.path}")
+            Logger.info(f"Shape: {(writer.n_rows, writer.n_points)}", verbose=False)
+            Logger.info(f"Size: {os.path.getsize(writer.path) / 1024 / 1024:.2f} MB", verbose=False)
+
+    def _append(self, writer: H5WindowWriter, noise_samples: WindowBatch, injection_samples: WindowBatch) -> None:
+        batch = WindowBatch.concatenate([noise_samples, injection_samples])
+        writer.append(
+            batch,
+            labels=np.concatenate([
+                np.zeros(len(noise_samples), dtype=np.int8),
+                np.ones(len(injection_samples), dtype=np.int8)
+            ]),
+            distances=self._optional(batch.distances, len(batch)),
+            snrs=self._optional(batch.snrs, len(batch)),
+            injection_times=self._optional(batch.injection_times, len(batch)),
+            models=batch.models if batch.models is not None else np.full(len(batch), b"", dtype='S1')
+        )
+
+    def _output_file(self, destination: str, group: Any) -> str:
+        file_name = self.file_name_template.format(group=group)
+        return os.path.join(destination, f"{file_name}.h5")
+
+    def _writer(self, output_file: str) -> H5WindowWriter:
+        return H5WindowWriter(
+            output_file,
+            compression=self.compression,
+            compression_opts=self.compression_opts,
+            time_format=self.time_format,
+            chunk_bytes=self.chunk_bytes,
+            shuffle=self.shuffle,
+            dataset_options=self.dataset_options
+        )
+
+    def _optional(self, values: np.ndarray, length: int) -> np.ndarray:
+        return values if values is not None else np.full(length, np.nan)
+
+    def _extract_metadata(
+        self,
+        writer: H5WindowWriter,
+        n_noise_samples: int,
+        n_injection_samples: int,
+        group: Any
+    ) -> Dict[str, Any]:
+        if not writer.n_rows:
+            return {}
+
+        metadata = {
+            **writer.statistics(),
+            'n_noise_samples': n_noise_samples,
+            'n_injection_samples': n_injection_samples,
+            'group': str(group)
+        }
+        if n_injection_samples:
+            metadata.update(writer.injection_statistics())
+        return metadata
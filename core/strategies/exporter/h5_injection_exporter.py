@@ -1,11 +1,12 @@
 import os
-import h5py
-import numpy as np
+from contextlib import ExitStack
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, Iterable
 
 from core.strategies.base.exporter import ExporterBase
-from core.types import InjectionTransformerData
+from core.types import InjectionTransformerData, WindowBatch
+from core.handlers.h5_window_writer import H5WindowWriter
+from core.utils.h5_filters import dataset_filters, validate_dataset_options
 from core.utils.logger import Logger
 
 @dataclass
@@ -13,117 +14,82 @@ class H5InjectionExporter(ExporterBase):
     compression:str = "gzip"
     compression_opts: int = 4
     file_name_template: str= "gw_strain_{distance}_kpc"
+    group_name_template: str = "gw_strain_{group}"
+    time_format: str = "compact"
+    chunk_bytes: int = 1 << 20
+    shuffle: bool = False
+    dataset_options: Dict[str, Dict[str, Any]] = None
+
+    def __post_init__(self):
+        dataset_filters(self.compression, self.compression_opts, self.shuffle)
+        validate_dataset_options(self.dataset_options)
 
     def export(self, data: InjectionTransformerData, destination: str, **kwargs) -> None:
-        os.makedirs(destination, exist_ok=True)
+        self.export_stream([data], destination, **kwargs)
 
-        for distance, samples in data.items():
-            if not samples:
-                Logger.warning(f"No samples for distance {distance} kpc, skipping")
-                continue
+    def export_stream(self, batches: Iterable[InjectionTransformerData], destination: str, **kwargs) -> None:
+        os.makedirs(destination, exist_ok=True)
+        writers: Dict[Any, H5WindowWriter] = dict()
 
-            Logger.info(f"Exporting {len(samples)} samples at {distance} kpc to HDF5.")
+        with ExitStack() as stack:
+            for batch in batches:
+                for distance, samples in batch.items():
+                    if distance not in writers:
+                        writers[distance] = stack.enter_context(self._writer(self._output_file(destination, distance)))
+                    samples = WindowBatch.from_samples(samples)
+                    writers[distance].append(
+                        samples,
+                        distances=samples.distances,
+                        snrs=samples.snrs,
+                        injection_times=samples.injection_times,
+                        **({'models': samples.models} if samples.models is not None else {})
+                    )
+                    Logger.info(f"Appended {len(samples)} samples {self._describe(distance)}", verbose=False)
 
-            file_name = self.file_name_template.format(distance=distance)
-            output_file = os.path.join(destination, f"{file_name}.h5")
+            for distance, writer in writers.items():
+                writer.write_attributes(self._extract_metadata(writer, distance))
 
-            times = np.stack([s['time'] for s in samples])
-            strains = np.stack([s['strain'] for s in samples])
-            sample_indices = np.array([s['sample_index'] for s in samples], dtype=np.int32)
-            file_indices = np.array([s['file_index'] for s in samples], dtype=np.int32)
-            detectors = np.array([s['detector'] for s in samples], dtype='S10')
-            gps_starts = np.array([s['gps_start'] for s in samples], dtype=np.float64)
-            distances_array = np.array([s['distance'] for s in samples], dtype=np.float64)
-            snrs = np.array([s['snr'] for s in samples], dtype=np.float64)
-            injection_times = np.array([s['injection_time'] for s in samples], dtype=np.float64)
+        for distance, writer in writers.items():
+            if not writer.n_rows:
+                Logger.warning(f"No samples {self._describe(distance)}, skipping")
+                continue
+            Logger.info(f"Exported {writer.n_rows} samples {self._describe(distance)} to HDF5.")
+            Logger.info(f"Dataset saved to: {writer.path}")
+            Logger.info(f"Shape: {(writer.n_rows, writer.n_points)}", verbose=False)
+            Logger.info(f"Size: {os.path.getsize(writer.path) / 1024 / 1024:.2f} MB", verbose=False)
 
-            with h5py.File(output_file, 'w') as f:
-                f.create_dataset(
-                    'times',
-                    data=times,
-                    compression=self.compression,
-                    compression_opts=self.compression_opts
-                )
-                f.create_dataset(
-                    'strains',
-                    data=strains,
-                    compression=self.compression,
-                    compression_opts=self.compression_opts
-                )
-                f.create_dataset(
-                    'sample_indices',
-                    data=sample_indices,
-                    compression=self.compression,
-                    compression_opts=self.compression_opts
-                )
-                f.create_dataset(
-                    'file_indices',
-                    data=file_indices,
-                    compression=self.compression,
-                    compression_opts=self.compression_opts
-                )
-                f.create_dataset(
-                    'detectors',
-                    data=detectors
-                )
-                f.create_dataset(
-                    'gps_starts',
-                    data=gps_starts,
-                    compression=self.compression,
-                    compression_opts=self.compression_opts
-                )
-                f.create_dataset(
-                    'distances',
-                    data=distances_array,
-                    compression=self.compression,
-                    compression_opts=self.compression_opts
-                )
-                f.create_dataset(
-                    'snrs',
-                    data=snrs,
-                    compression=self.compression,
-                    compression_opts=self.compression_opts
-                )
-                f.create_dataset(
-                    'injection_times',
-                    data=injection_times,
-                    compression=self.compression,
-                    compression_opts=self.compression_opts
-                )
+    def _output_file(self, destination: str, distance: Any) -> str:
+        if isinstance(distance, str):
+            file_name = self.group_name_template.format(group=distance)
+        else:
+            file_name = self.file_name_template.format(distance=distance)
+        return os.path.join(destination, f"{file_name}.h5")
 
-                metadata = self._extract_metadata(samples, distance)
-                for key, value in metadata.items():
-                    f.attrs[key] = value
+    def _describe(self, distance: Any) -> str:
+        return f"for {distance}" if isinstance(distance, str) else f"at {distance} kpc"
 
-            Logger.info(f"Dataset saved to: {output_file}")
-            Logger.info(f"Shape: {strains.shape}", verbose=False)
-            Logger.info(f"Size: {os.path.getsize(output_file) / 1024 / 1024:.2f} MB", verbose=False)
+    def _writer(self, output_file: str) -> H5WindowWriter:
+        return H5WindowWriter(
+            output_file,
+            compression=self.compression,
+            compression_opts=self.compression_opts,
+            time_format=self.time_format,
+            chunk_bytes=self.chunk_bytes,
+            shuffle=self.shuffle,
+            dataset_options=self.dataset_options
+        )
 
-    def _extract_metadata(self, samples: list, distance: float) -> Dict[str, Any]:
-        if not samples:
+    def _extract_metadata(self, writer: H5WindowWriter, distance: Any) -> Dict[str, Any]:
+        if not writer.n_rows:
             return {}
 
-        first_sample = samples[0]
-        window_duration = first_sample['time'][-1] - first_sample['time'][0]
-        sampling_rate = len(first_sample['time']) / window_duration
-
-        unique_detectors = sorted(set(s['detector'] for s in samples))
-        unique_gps_starts = sorted(set(s['gps_start'] for s in samples))
-
-        snr_values = [s['snr'] for s in samples]
-
+        group = {'distance_kpc': distance} if not isinstance(distance, str) else {
+            'target_snr': distance,
+            'distance_min': writer.distances.minimum,
+            'distance_max': writer.distances.maximum
+        }
         return {
-            'n_samples': len(samples),
-            'distance_kpc': distance,
-            'window_duration': window_duration,
-            'sampling_rate': sampling_rate,
-            'n_points_per_sample': len(first_sample['time']),
-            'detectors': ','.join(unique_detectors),
-            'n_files': len(set(s['file_index'] for s in samples)),
-            'gps_start_min': min(unique_gps_starts),
-            'gps_start_max': max(unique_gps_starts),
-            'snr_min': min(snr_values),
-            'snr_max': max(snr_values),
-            'snr_mean': np.mean(snr_values),
-            'snr_std': np.std(snr_values)
+            **writer.statistics(),
+            **group,
+            **writer.injection_statistics()
         }
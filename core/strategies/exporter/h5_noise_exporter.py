@@ -1,11 +1,11 @@
 import os
-import h5py
-import numpy as np
-from typing import Dict, Any
+from typing import Any, Dict, Iterable
 from dataclasses import dataclass
 
 from core.strategies.base.exporter import ExporterBase
-from core.types import TransformerData
+from core.types import TransformerData, WindowBatch
+from core.handlers.h5_window_writer import H5WindowWriter
+from core.utils.h5_filters import dataset_filters, validate_dataset_options
 from core.utils.logger import Logger
 
 @dataclass
@@ -13,81 +13,45 @@ class H5NoiseExporter(ExporterBase):
     compression:str = "gzip"
     compression_opts: int = 4
     file_name: str= "strain_noise"
+    time_format: str = "compact"
+    chunk_bytes: int = 1 << 20
+    shuffle: bool = False
+    dataset_options: Dict[str, Dict[str, Any]] = None
+
+    def __post_init__(self):
+        dataset_filters(self.compression, self.compression_opts, self.shuffle)
+        validate_dataset_options(self.dataset_options)
 
     def export(self, data: TransformerData, destination: str, **kwargs) -> None:
-        Logger.info(f"Exporting {len(data)} samples to HDF5")
+        self.export_stream([data], destination, **kwargs)
+
+    def export_stream(self, batches: Iterable[Any], destination: str, **kwargs) -> None:
         os.makedirs(destination, exist_ok=True)
         output_file = os.path.join(destination, f"{self.file_name}.h5")
 
-        times = np.stack([s['time'] for s in data])
-        strains = np.stack([s['strain'] for s in data])
-        sample_indices = np.array([s['sample_index'] for s in data], dtype=np.int32)
-        file_indices = np.array([s['file_index'] for s in data], dtype=np.int32)
-        detectors = np.array([s['detector'] for s in data], dtype='S10')
-        gps_starts = np.array([s['gps_start'] for s in data], dtype=np.float64)
-
-        with h5py.File(output_file, 'w') as f:
-            f.create_dataset(
-                'times',
-                data=times,
-                compression=self.compression,
-                compression_opts=self.compression_opts
-            )
-            f.create_dataset(
-                'strains',
-                data=strains,
-                compression=self.compression,
-                compression_opts=self.compression_opts
-            )
-            f.create_dataset(
-                'sample_indices',
-                data=sample_indices,
-                compression=self.compression,
-                compression_opts=self.compression_opts
-            )
-            f.create_dataset(
-                'file_indices',
-                data=file_indices,
-                compression=self.compression,
-                compression_opts=self.compression_opts
-            )
-            f.create_dataset(
-                'detectors',
-                data=detectors
-            )
-            f.create_dataset(
-                'gps_starts',
-                data=gps_starts,
-                compression=self.compression,
-                compression_opts=self.compression_opts
-            )
+        with self._writer(output_file) as writer:
+            for batch in batches:
+                batch = WindowBatch.from_samples(batch)
+                writer.append(batch)
+                Logger.info(f"Appended {len(batch)} samples to {output_file}", verbose=False)
 
-            metadata = self._extract_metadata(data)
-            for key, value in metadata.items():
-                f.attrs[key] = value
+            if not writer.n_rows:
+                Logger.warning("No samples to export, skipping")
+                return
+            writer.write_attributes(writer.statistics())
 
+        Logger.info(f"Exported {writer.n_rows} samples to HDF5")
         Logger.info(f"Dataset saved to: {output_file}")
-        Logger.info(f"Shape: {strains.shape}", verbose=False)
+        Logger.info(f"Shape: {(writer.n_rows, writer.n_points)}", verbose=False)
         Logger.info(f"Size: {os.path.getsize(output_file) / 1024 / 1024:.2f} MB", verbose=False)
 
-    def _extract_metadata(self, data: TransformerData) -> Dict[str, Any]:
-        if not data:
-            return {}
-
-        first_sample = data[0]
-        window_duration = first_sample['time'][-1] - first_sample['time'][0]
-        sampling_rate = len(first_sample['time']) / window_duration
-
-        unique_detectors = sorted(set(s['detector'] for s in data))
-        unique_gps_starts = sorted(set(s['gps_start'] for s in data))
-
-        return {
-            'n_samples': len(data),
-            'window_duration': window_duration,
-            'sampling_rate': sampling_rate,
-            'n_points_per_sample': len(first_sample['time']),
-            'detectors': ','.join(unique_detectors),
-            'n_files': len(set(s['file_index'] for s in data)),
-            'gps_start_min': min(unique_gps_starts),
-            'gps_start_max': max(unique_gps_starts),
-        }
+    def _writer(self, output_file: str) -> H5WindowWriter:
+        return H5WindowWriter(
+            output_file,
+            compression=self.compression,
+            compression_opts=self.compression_opts,
+            time_format=self.time_format,
+            chunk_bytes=self.chunk_bytes,
+            shuffle=self.shuffle,
+            dataset_options=self.dataset_options
+        )
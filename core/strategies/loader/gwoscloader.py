@@ -1,57 +1,77 @@
-import fsspec
-import h5py
-import tempfile
-import os
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Iterator, List
 
 from core.strategies.base.loader import LoaderBase
 from core.handlers.gwosc_data_fetcher import GWOSCDataFetcher
+from core.handlers.gwosc_segment_catalog import GWOSCSegmentCatalog
+from core.handlers.strain_cache import StrainCache
+from core.handlers.strain_downloader import StrainDownloader
+from core.handlers.strain_reader import StrainReader
 from core.utils.logger import Logger
-from core.types.custom_types import LoaderData
+from core.utils.streaming import merge_units
+from core.types.custom_types import LoaderData, StrainSpan
 
 @dataclass
 class GWOSCLoader(LoaderBase):
     detectors: List[str] = None
-    n_samples: List[str] = 1
+    n_samples: int = 1
+    cache_dir: str = ".cache/strain"
+    cache_max_size_gb: float = 50.0
+    verify_checksum: bool = False
+    max_concurrent_downloads: int = 4
+    max_retries: int = 3
+    retry_backoff: float = 1.0
+    download_chunk_size_mb: float = 8.0
+    lazy: bool = True
+    run: str = GWOSCDataFetcher.DEFAULT_RUN
+    gps_start: int = GWOSCDataFetcher.DEFAULT_GPS_START
+    gps_end: int = GWOSCDataFetcher.DEFAULT_GPS_END
+    min_duty_cycle: float = 100.0
+    catalog_path: str = ".cache/gwosc_catalog.sqlite"
+    catalog_ttl_hours: float = 24.0
 
-    def load(self, **kwargs) -> LoaderData:
+    def load(self, span: StrainSpan = None, n_files: int = None, **kwargs) -> LoaderData:
+        return merge_units(self.stream(span=span, n_files=n_files, **kwargs))
+
+    def stream(self, span: StrainSpan = None, n_files: int = None, **kwargs) -> Iterator[LoaderData]:
+        catalog = GWOSCSegmentCatalog(
+            path=self.catalog_path,
+            ttl_hours=self.catalog_ttl_hours
+        )
         urls = GWOSCDataFetcher.match_gwosc_strain_timelines(
-            n_samples=self.n_samples
+            n_samples=self.n_samples,
+            detectors=self.detectors,
+            catalog=catalog,
+            run=self.run,
+            gps_start=self.gps_start,
+            gps_end=self.gps_end,
+            min_duty_cycle=self.min_duty_cycle,
+            n_sources=n_files
+        )
+        cache = StrainCache(
+            cache_dir=self.cache_dir,
+            max_size_gb=self.cache_max_size_gb,
+            verify_checksum=self.verify_checksum
+        )
+        downloader = StrainDownloader(
+            cache=cache,
+            max_concurrent_downloads=self.max_concurrent_downloads,
+            max_retries=self.max_retries,
+            retry_backoff=self.retry_backoff,
+            chunk_size_mb=self.download_chunk_size_mb
+        )
+        local_files = downloader.download(
+            [url for detector in self.detectors for url in urls[detector]]
         )
+        cache.log_report()
 
-        data = dict()
         for detector in self.detectors:
-            data[detector] = dict()
             for index in range(len(urls[detector])):
-                detector_data = self._files_from_url(urls[detector][index])
-                data[detector][index] = detector_data
+                detector_data = StrainReader.read_hdf5(
+                    local_files[urls[detector][index]],
+                    span=span,
+                    lazy=self.lazy,
+                    source_id=urls[detector][index]
+                )
                 Logger.info(f"Loaded data for {detector}, file {index + 1}")
-
-        return data
-
-    def _files_from_url(self, url: str) -> Dict:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_file = os.path.join(temp_dir, "temp_data.hdf5")
-
-            Logger.info(f"Downloading file from URL: {url}", verbose=False)
-            with fsspec.open(url, mode="rb") as remote_f:
-                with open(temp_file, "wb") as local_f:
-                    local_f.write(remote_f.read())
-
-            Logger.info(f"Reading temp file: {temp_file}", verbose=False)
-            with h5py.File(temp_file, "r") as file:
-                strain = file['strain']['Strain'][()]
-                delta_t = file['strain']['Strain'].attrs['Xspacing']
-                time_sampling = file['strain']['Strain'].attrs['Xspacing']
-                meta = file['meta']
-                gps_start = meta['GPSstart'][()]
-                duration = meta['Duration'][()]
-
-        return {
-            "strain": strain,
-            "gps_start": gps_start,
-            "duration": duration,
-            "time_sampling": time_sampling,
-            "delta_t": delta_t
-        }
+                yield {detector: {index: detector_data}}
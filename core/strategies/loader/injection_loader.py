@@ -1,8 +1,8 @@
-from typing import List
+from typing import Iterator, List
 
 from core.strategies.base.loader import LoaderBase
 from core.strategies.loader.gwoscloader import GWOSCLoader
-from core.strategies.loader.waveform_loader import WaveformLoader
+from core.handlers.waveform_bank import WaveformBank
 from core.types import InjectionLoaderData
 from core.utils.logger import Logger
 
@@ -12,24 +12,46 @@ class InjectionLoader(LoaderBase):
         self,
         waveform_path: str,
         detectors: List[str] = None,
-        n_samples: int = 1
+        n_samples: int = 1,
+        cache_dir: str = ".cache/strain",
+        cache_max_size_gb: float = 50.0,
+        max_concurrent_downloads: int = 4,
+        strain_loader: LoaderBase = None,
+        template_cache_dir: str = ".cache/templates"
     ):
-        self.gwosc_loader = GWOSCLoader(
+        self.strain_loader = strain_loader or GWOSCLoader(
             detectors=detectors,
-            n_samples=n_samples
+            n_samples=n_samples,
+            cache_dir=cache_dir,
+            cache_max_size_gb=cache_max_size_gb,
+            max_concurrent_downloads=max_concurrent_downloads
         )
-        self.waveform_loader = WaveformLoader(
-            waveform_path=waveform_path
+        self.waveform_bank = WaveformBank(
+            source=waveform_path,
+            cache_dir=template_cache_dir
         )
 
     def load(self, **kwargs) -> InjectionLoaderData:
-        Logger.info("Loading strain data from GWOSC")
-        strain_data = self.gwosc_loader.load(**kwargs)
+        Logger.info("Loading strain data")
+        strain_data = self.strain_loader.load(**kwargs)
 
-        Logger.info("Loading waveform data")
-        waveform_data = self.waveform_loader.load(**kwargs)
+        Logger.info(f"Loading waveform data ({len(self.waveform_bank.models)} models)")
+        waveform_data = self.waveform_bank.waveform(self.waveform_bank.models[0])
 
         return {
             "strain": strain_data,
-            "waveform": waveform_data
+            "waveform": waveform_data,
+            "bank": self.waveform_bank
         }
+
+    def stream(self, **kwargs) -> Iterator[InjectionLoaderData]:
+        Logger.info(f"Loading waveform data ({len(self.waveform_bank.models)} models)")
+        waveform_data = self.waveform_bank.waveform(self.waveform_bank.models[0])
+
+        Logger.info("Streaming strain data")
+        for strain_unit in self.strain_loader.stream(**kwargs):
+            yield {
+                "strain": strain_unit,
+                "waveform": waveform_data,
+                "bank": self.waveform_bank
+            }
@@ -0,0 +1,141 @@
+import os
+import re
+import json
+import hashlib
+import h5py
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List
+
+from core.strategies.base.loader import LoaderBase
+from core.handlers.strain_reader import StrainReader
+from core.utils.logger import Logger
+from core.utils.streaming import merge_units
+from core.utils.source_sampling import get_sources_per_sample
+from core.types.custom_types import LoaderData, StrainSpan
+
+@dataclass
+class LocalStrainLoader(LoaderBase):
+    directory: str
+    detectors: List[str] = None
+    n_samples: int = 1
+    index_path: str = None
+    rescan: bool = False
+    lazy: bool = True
+    channel_template: str = "{detector}:GWOSC-4KHZ_R1_STRAIN"
+
+    FILE_PATTERN = re.compile(r"^[A-Z]-(?P<detector>[A-Z]\d)_.*-(?P<gps_start>\d+)-(?P<duration>\d+)\.(?P<ext>hdf5|h5|gwf)$")
+    EXTENSIONS = (".hdf5", ".h5", ".gwf")
+    INDEX_FILE = ".strain_index.json"
+    INDEX_CACHE_DIR = ".cache/strain_index"
+
+    def load(self, span: StrainSpan = None, n_files: int = None, **kwargs) -> LoaderData:
+        return merge_units(self.stream(span=span, n_files=n_files, **kwargs))
+
+    def stream(self, span: StrainSpan = None, n_files: int = None, **kwargs) -> Iterator[LoaderData]:
+        index = self._load_index()
+        segments = self._coincident_segments(index)
+        n_sources = n_files or get_sources_per_sample(n_samples=self.n_samples)
+        segments = segments[:n_sources]
+        Logger.info(f"Sources matched collected: {len(segments)}", verbose=False)
+
+        for detector in self.detectors:
+            for file_index, gps_start in enumerate(segments):
+                entry = index[detector][gps_start]
+                file_data = self._read_entry(entry, detector, span)
+                Logger.info(f"Loaded data for {detector}, file {file_index + 1}")
+                yield {detector: {file_index: file_data}}
+
+    def _read_entry(self, entry: Dict[str, Any], detector: str, span: StrainSpan):
+        path = os.path.join(self.directory, entry["path"])
+        if path.endswith(".gwf"):
+            channel = self.channel_template.format(detector=detector)
+            return StrainReader.read_gwf(path, channel=channel, span=span)
+        return StrainReader.read_hdf5(path, span=span, lazy=self.lazy)
+
+    def _coincident_segments(self, index: Dict[str, Dict[int, Dict[str, Any]]]) -> List[int]:
+        missing = [detector for detector in self.detectors if detector not in index]
+        if missing:
+            raise ValueError(f"No local strain files found for detectors {missing} in {self.directory}")
+
+        common = set.intersection(*(set(index[detector]) for detector in self.detectors))
+        return sorted(common)
+
+    def _load_index(self) -> Dict[str, Dict[int, Dict[str, Any]]]:
+        index_paths = self._index_paths()
+        existing = [path for path in index_paths if os.path.exists(path)]
+
+        if existing and not self.rescan:
+            index_path = max(existing, key=os.path.getmtime)
+            Logger.info(f"Using strain index {index_path}", verbose=False)
+            with open(index_path, "r") as f:
+                entries = json.load(f)
+        else:
+            entries = self._scan()
+            Logger.info(f"Indexed {len(entries)} strain files in {self.directory}")
+            self._write_index(entries, index_paths)
+
+        index = dict()
+        for entry in entries:
+            index.setdefault(entry["detector"], {})[entry["gps_start"]] = entry
+        return index
+
+    def _index_paths(self) -> List[str]:
+        if self.index_path:
+            return [self.index_path]
+        key = hashlib.sha256(os.path.abspath(self.directory).encode("utf-8")).hexdigest()
+        return [
+            os.path.join(self.directory, self.INDEX_FILE),
+            os.path.join(self.INDEX_CACHE_DIR, f"{key}.json")
+        ]
+
+    def _write_index(self, entries: List[Dict[str, Any]], index_paths: List[str]) -> None:
+        for index_path in index_paths:
+            temp_path = f"{index_path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+                with open(temp_path, "w") as f:
+                    json.dump(entries, f)
+                os.replace(temp_path, index_path)
+                Logger.info(f"Saved strain index to {index_path}", verbose=False)
+                return
+            except OSError as e:
+                Logger.warning(f"Could not write strain index {index_path} ({e})")
+        Logger.warning("Keeping the strain index in memory for this run")
+
+    def _scan(self) -> List[Dict[str, Any]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for file_name in sorted(files):
+                if not file_name.endswith(self.EXTENSIONS):
+                    continue
+                path = os.path.join(root, file_name)
+                entry = self._describe(path, file_name)
+                if entry is None:
+                    Logger.warning(f"Could not determine detector and GPS span of {path}, skipping")
+                    continue
+                entry["path"] = os.path.relpath(path, self.directory)
+                entries.append(entry)
+        return entries
+
+    def _describe(self, path: str, file_name: str) -> Dict[str, Any]:
+        match = self.FILE_PATTERN.match(file_name)
+        if match:
+            return {
+                "detector": match.group("detector"),
+                "gps_start": int(match.group("gps_start")),
+                "duration": int(match.group("duration"))
+            }
+        if file_name.endswith(".gwf"):
+            return None
+
+        try:
+            with h5py.File(path, "r") as file:
+                meta = file['meta']
+                detector = meta['Detector'][()]
+                return {
+                    "detector": detector.decode() if isinstance(detector, bytes) else str(detector),
+                    "gps_start": int(meta['GPSstart'][()]),
+                    "duration": int(meta['Duration'][()])
+                }
+        except (OSError, KeyError):
+            return None
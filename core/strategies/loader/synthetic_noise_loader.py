@@ -0,0 +1,112 @@
+import uuid
+import numpy as np
+from dataclasses import dataclass
+from typing import Iterator, List
+from numpy.typing import NDArray
+
+from core.strategies.base.loader import LoaderBase
+from core.handlers.strain_reader import StrainReader
+from core.utils.lazy_strain import span_to_indices
+from core.utils.logger import Logger
+from core.utils.streaming import merge_units
+from core.utils.source_sampling import get_sources_per_sample
+from core.types.custom_types import LoaderData, StrainSpan
+
+@dataclass
+class SyntheticNoiseLoader(LoaderBase):
+    detectors: List[str] = None
+    n_samples: int = 1
+    n_files: int = None
+    sample_rate: int = 4096
+    duration: float = 4096.0
+    gps_start: float = 1256655618.0
+    psd_name: str = "aLIGOZeroDetHighPower"
+    psd_file: str = None
+    low_frequency_cutoff: float = 10.0
+    batch_size: int = 4
+    seed: int = None
+
+    SAMPLE_RATES = (4096, 16384)
+
+    def __post_init__(self):
+        if self.sample_rate not in self.SAMPLE_RATES:
+            raise ValueError(f"sample_rate must be one of {self.SAMPLE_RATES}, got {self.sample_rate}")
+
+    def load(self, span: StrainSpan = None, n_files: int = None, **kwargs) -> LoaderData:
+        return merge_units(self.stream(span=span, n_files=n_files, **kwargs))
+
+    def stream(self, span: StrainSpan = None, n_files: int = None, **kwargs) -> Iterator[LoaderData]:
+        n_files = self.n_files or n_files or get_sources_per_sample(n_samples=self.n_samples)
+        delta_t = 1.0 / self.sample_rate
+        n_points = int(self.duration * self.sample_rate)
+        start, stop = span_to_indices(span, n_points, delta_t)
+        scale = self._spectrum_scale(n_points, delta_t)
+        rng = np.random.default_rng(self.seed)
+        source_id = self._source_id()
+
+        Logger.info(
+            f"Generating {n_files} synthetic files per detector from PSD "
+            f"{self.psd_file or self.psd_name} at {self.sample_rate} Hz"
+        )
+
+        for detector in self.detectors:
+            for batch_start in range(0, n_files, self.batch_size):
+                n_batch = min(self.batch_size, n_files - batch_start)
+                strains = self._generate_batch(rng, n_batch, n_points, scale)
+
+                for batch_index in range(n_batch):
+                    file_index = batch_start + batch_index
+                    file_data = {
+                        "strain": np.array(strains[batch_index, start:stop]),
+                        "gps_start": self.gps_start + file_index * self.duration,
+                        "duration": self.duration,
+                        "time_sampling": delta_t,
+                        "delta_t": delta_t,
+                        "offset": start,
+                        "source_id": f"{source_id}|{n_files}|{detector}|{file_index}"
+                    }
+                    Logger.info(f"Generated data for {detector}, file {file_index + 1}")
+                    yield {detector: {file_index: file_data}}
+
+    def _source_id(self) -> str:
+        seed = self.seed if self.seed is not None else f"unseeded-{uuid.uuid4().hex}"
+        psd = self.psd_name
+        if self.psd_file is not None:
+            psd = StrainReader.file_identity(self.psd_file)
+        return (
+            f"synthetic|{psd}|{seed}|{self.sample_rate}|{self.duration}|"
+            f"{self.low_frequency_cutoff}|{self.gps_start}"
+        )
+
+    def _spectrum_scale(self, n_points: int, delta_t: float) -> NDArray[np.float64]:
+        from pycbc.psd import from_string, from_txt
+
+        n_frequencies = n_points // 2 + 1
+        delta_f = 1.0 / (n_points * delta_t)
+        if self.psd_file is not None:
+            psd = from_txt(
+                self.psd_file,
+                n_frequencies,
+                delta_f,
+                self.low_frequency_cutoff,
+                is_asd_file=False
+            )
+        else:
+            psd = from_string(self.psd_name, n_frequencies, delta_f, self.low_frequency_cutoff)
+
+        scale = np.sqrt(n_points * psd.numpy() / (4.0 * delta_t))
+        scale[0] = 0.0
+        if n_points % 2 == 0:
+            scale[-1] = 0.0
+        return scale
+
+    @staticmethod
+    def _generate_batch(
+        rng: np.random.Generator,
+        n_batch: int,
+        n_points: int,
+        scale: NDArray[np.float64]
+    ) -> NDArray[np.float64]:
+        spectrum = rng.standard_normal((n_batch, len(scale), 2)).view(np.complex128)[..., 0]
+        spectrum *= scale
+        return np.fft.irfft(spectrum, n=n_points, axis=1)
@@ -0,0 +1,230 @@
+import math
+import numpy as np
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from dataclasses import dataclass
+
+import core.constants.gw_constants as constants
+from core.strategies.transformer.injection_transformer import InjectionTransformer
+from core.strategies.transformer.noise_transformer import NoiseTransformer
+from core.types import (
+    CombinedTransformerData,
+    GWOSCFileData,
+    InjectionLoaderData,
+    WindowBatch
+)
+from core.handlers.waveform_bank import WaveformBank
+from core.utils.logger import Logger
+from core.utils.preprocessing import WhiteningResult
+from core.utils.streaming import merge_batches
+from core.utils.waveform_procesor import rescale_waveform_amplitude
+from core.injections.waveform_injector import WaveformInjector
+
+@dataclass
+class CombinedTransformer(InjectionTransformer):
+    NOISE_KEY = "noise"
+
+    n_noise_samples: int = None
+    window_stride: float = None
+
+    def __post_init__(self):
+        super().__post_init__()
+        if self.n_workers != 1:
+            raise ValueError(f"CombinedTransformer processes files serially, n_workers must be 1, got {self.n_workers}")
+        if not self.linear_distance_scaling:
+            raise ValueError("CombinedTransformer always scales one injected signal per distance, linear_distance_scaling must be true")
+        if self.snr_method != "batch":
+            raise ValueError(f"CombinedTransformer only supports snr_method batch, got {self.snr_method}")
+        self.use_first_half = True
+        self.noise = NoiseTransformer(
+            detectors=self.detectors,
+            window_size=self.window_size,
+            whitening_cut=self.whitening_cut,
+            use_second_half=True,
+            window_stride=self.window_stride
+        )
+
+    def loading_hints(self) -> Dict[str, Any]:
+        noise_files = math.ceil(
+            (self.n_noise_samples or self.n_samples) / max(1, self.noise._windows_per_file(self.file_duration))
+        )
+        return {"n_files": max(self._files_needed(self.file_duration), noise_files)}
+
+    def transform(self, data: InjectionLoaderData, **kwargs) -> CombinedTransformerData:
+        return merge_batches(self.transform_stream([data]))
+
+    def transform_stream(self, units: Iterable[InjectionLoaderData], **kwargs) -> Iterator[CombinedTransformerData]:
+        noise_count = {detector: 0 for detector in self.detectors}
+        injection_count = dict()
+        bank = None
+        n_noise_samples = None
+
+        for unit in units:
+            if bank is None:
+                bank = self._prepare_bank(unit)
+                n_noise_samples = self.n_noise_samples or self.n_samples * len(bank.models)
+
+            for detector, detector_files in unit["strain"].items():
+                if detector not in self.detectors:
+                    continue
+                for file_index, file_data in detector_files.items():
+                    models = [
+                        model for model in bank.models
+                        if any(injection_count.get((model, key, detector), 0) < self.n_samples for key in self._group_keys())
+                    ]
+                    noise_remaining = n_noise_samples - noise_count[detector]
+                    if not models and noise_remaining <= 0:
+                        continue
+
+                    Logger.info(f"Processing {detector} file {file_index + 1}", verbose=False)
+                    noise_samples, windows_by_model = self._process_file_combined(file_data, file_index, detector, bank, models)
+
+                    noise_samples = noise_samples[:max(0, noise_remaining)]
+                    noise_count[detector] += len(noise_samples)
+                    batches = {key: [] for key in self._group_keys()}
+                    for model, windows in windows_by_model.items():
+                        for key, samples in windows.items():
+                            count_key = (model, key, detector)
+                            samples = samples[:max(0, self.n_samples - injection_count.get(count_key, 0))]
+                            injection_count[count_key] = injection_count.get(count_key, 0) + len(samples)
+                            batches[key].append(samples)
+
+                    batch: CombinedTransformerData = {self.NOISE_KEY: noise_samples}
+                    batch.update({key: WindowBatch.concatenate(samples) for key, samples in batches.items()})
+                    yield batch
+
+        Logger.info(f"Generated {sum(noise_count.values())} noise samples")
+        for key in self._group_keys():
+            total = sum(count for (_, group, _), count in injection_count.items() if group == key)
+            Logger.info(f"Generated {total} injection samples for {key}")
+        if bank is not None:
+            bank.log_report()
+        self._log_psd_cache()
+
+    def _group_keys(self) -> List[Any]:
+        return [self._target_label()] if self.target_snr is not None else list(self.distances)
+
+    def _process_file_combined(
+        self,
+        file_data: GWOSCFileData,
+        file_index: int,
+        detector: str,
+        bank: WaveformBank,
+        models: List[str]
+    ) -> Tuple[WindowBatch, Dict[str, Dict[Any, WindowBatch]]]:
+        strain = np.asarray(file_data["strain"])
+        ts = file_data["time_sampling"]
+        gps_start = file_data["gps_start"]
+        file_length = int(round(file_data["duration"] / ts))
+        epoch = file_data.get("offset", 0) * ts
+
+        Logger.info("Whitening and band-passing noise", verbose=False)
+        noise = self._preprocess(
+            strain,
+            ts,
+            epoch,
+            detector=detector,
+            gps_start=gps_start + epoch,
+            source_id=file_data.get("source_id")
+        )
+
+        noise_samples = self.noise._create_windows(noise.strain, ts, gps_start, file_index, detector, file_length)
+        windows_by_model = {
+            model: self._injection_windows(noise, strain, file_data, file_index, detector, bank, model)
+            for model in models
+        }
+        return noise_samples, windows_by_model
+
+    def _injection_windows(
+        self,
+        noise: WhiteningResult,
+        strain: np.ndarray,
+        file_data: GWOSCFileData,
+        file_index: int,
+        detector: str,
+        bank: WaveformBank,
+        model: str
+    ) -> Dict[Any, WindowBatch]:
+        ts = file_data["time_sampling"]
+        sampling_frequency = 1.0 / ts
+        offset = file_data.get("offset", 0)
+        reference_distance = constants.default_kpc_distance
+
+        _, template = bank.template(model, self.polarization, sampling_frequency)
+        waveform_reference = rescale_waveform_amplitude(template, reference_distance)
+
+        positions = WaveformInjector.injection_positions(
+            strain_length=len(strain),
+            waveform_length=len(waveform_reference),
+            injection_interval_seconds=self.injection_interval_seconds,
+            sampling_frequency=sampling_frequency,
+            n_injections=self._injections_needed(),
+            use_first_half=True,
+            sample_offset=offset,
+            total_length=int(round(file_data["duration"] / ts))
+        )
+        reference_snrs = WaveformInjector.calculate_snr_batch(
+            waveform=waveform_reference,
+            strain=strain,
+            injection_indices=positions - offset,
+            sample_duration_seconds=ts
+        )
+
+        if self.target_snr is not None:
+            valid = reference_snrs > 0
+            positions, reference_snrs = positions[valid], reference_snrs[valid]
+            seed = None if self.seed is None else [self.seed, file_index, self.detectors.index(detector), bank.models.index(model)]
+            snrs = self._draw_target_snrs(len(positions), np.random.default_rng(seed))
+            amplitudes = snrs / reference_snrs
+            groups = {self._target_label(): (1.0, snrs, reference_distance / amplitudes)}
+        else:
+            amplitudes = np.ones(len(positions))
+            groups = {
+                distance: (
+                    reference_distance / distance,
+                    snrs,
+                    np.full(len(positions), float(distance))
+                )
+                for distance, snrs in WaveformInjector.snr_by_distance(
+                    reference_snrs,
+                    reference_distance,
+                    self.distances
+                ).items()
+            }
+
+        Logger.info(f"Injecting {len(positions)} waveforms of {model}", verbose=False)
+        signal = self.workspace.buffer(len(strain))[:len(strain)]
+        signal.fill(0.0)
+        WaveformInjector.add_injections(signal, waveform_reference, positions - offset, amplitudes)
+
+        Logger.info("Whitening and band-passing injected signal with the noise PSD", verbose=False)
+        filtered_signal = self._preprocess(
+            signal,
+            ts,
+            offset * ts,
+            psd=noise.psd,
+            scaling_factor=noise.scaling_factor
+        ).strain
+
+        waveform_duration_seconds = len(waveform_reference) * ts
+        windows = dict()
+        for key, (amplitude, snrs, distances) in groups.items():
+            injection_log = [
+                {
+                    "time_inj": sample_index / sampling_frequency,
+                    "snr": float(snr),
+                    "waveform_duration": waveform_duration_seconds,
+                    "distance": float(distance)
+                }
+                for sample_index, snr, distance in zip(positions, snrs, distances)
+            ]
+            windows[key] = self._create_windows(
+                noise.strain + filtered_signal * amplitude,
+                ts,
+                file_data["gps_start"],
+                file_index,
+                detector,
+                key,
+                injection_log,
+                model
+            )
+        return windows
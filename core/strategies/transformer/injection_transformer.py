@@ -1,13 +1,28 @@
+import math
 import numpy as np
-from typing import List, Dict
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from numpy.typing import NDArray
+from pycbc.types.frequencyseries import FrequencySeries
 from dataclasses import dataclass
 
+import core.constants.gw_constants as constants
 from core.strategies.base.transformer import TransformerBase
-from core.types import InjectionLoaderData, InjectionTransformerData, InjectionWindowedSample
+from core.types import (
+    GWOSCFileData,
+    LoaderData,
+    InjectionLoaderData,
+    InjectionTransformerData,
+    WindowBatch
+)
+from core.handlers.psd_cache import PSDCache
+from core.handlers.waveform_bank import WaveformBank
 from core.utils.logger import Logger
-from core.utils.preprocessing import whitening, bandpass
-from core.utils.waveform_procesor import resample_waveform, rescale_waveform_amplitude, waveform_to_dimensionless
+from core.utils.preprocessing import WhiteningResult, preprocess
+from core.utils.parallel import run_file_tasks
+from core.utils.streaming import batch_length
+from core.utils.waveform_procesor import rescale_waveform_amplitude
 from core.injections.waveform_injector import WaveformInjector
+from core.injections.strain_workspace import StrainWorkspace
 
 @dataclass
 class InjectionTransformer(TransformerBase):
@@ -22,125 +37,651 @@ class InjectionTransformer(TransformerBase):
     n_samples: int = 1
     polarization: str = "h_plus"
     use_first_half: bool = True
+    read_partial: bool = True
+    span_padding: float = 8.0
+    n_workers: int = 1
+    linear_distance_scaling: bool = True
+    preprocessing_engine: str = "pycbc"
+    taper: str = "tukey"
+    normalization: str = "diagnostic"
+    block_duration: float = 64.0
+    psd_cache_dir: str = None
+    psd_cache_entries: int = 256
+    snr_method: str = "batch"
+    target_snr: List[float] = None
+    target_snr_weights: List[float] = None
+    seed: int = None
+    window_offsets: int = 0
+    max_window_offset: float = None
+    file_duration: float = constants.gwosc_file_duration
+
+    def __post_init__(self):
+        self.psd_cache = PSDCache(self.psd_cache_dir, self.psd_cache_entries) if self.psd_cache_dir else None
+        self.workspace = StrainWorkspace()
+        if self.target_snr is not None:
+            self._validate_target_snr()
+
+    def loading_hints(self) -> Dict[str, Any]:
+        hints = {"n_files": self._files_needed(self.file_duration)}
+        if not (self.read_partial and self.use_first_half):
+            return hints
+        hints["span"] = {
+            "start_fraction": 0.0,
+            "end_fraction": 0.5,
+            "padding_seconds": (
+                self.whitening_cut / 2
+                + WaveformInjector.SNR_CALCULATION_WINDOW_SECONDS
+                + self.window_size
+                + (self.max_window_offset or 0.0)
+                + self.span_padding
+            )
+        }
+        return hints
+
+    def _injections_needed(self) -> int:
+        return math.ceil(self.n_samples / (1 + self.window_offsets)) + 2
+
+    def _files_needed(self, duration: float) -> int:
+        injections_per_file = int(int(duration / self.injection_interval_seconds) * (0.5 if self.use_first_half else 1.0)) - 2
+        return math.ceil(self.n_samples / max(1, injections_per_file * (1 + self.window_offsets)))
 
     def transform(self, data: InjectionLoaderData, **kwargs) -> InjectionTransformerData:
         strain_data = data["strain"]
-        waveform_data = data["waveform"]
+        bank = self._prepare_bank(data)
 
-        time_wf = waveform_data["time"]
-        waveform_raw = waveform_data[self.polarization]
+        if self.target_snr is not None:
+            return self._transform_target(strain_data, bank)
 
-        waveform_duration = time_wf[-1] - time_wf[0]
-        if self.window_size <= waveform_duration:
-            raise ValueError(
-                f"window_size ({self.window_size}s) must be greater than "
-                f"waveform_duration ({waveform_duration:.4f}s)"
-            )
+        if self.linear_distance_scaling:
+            return self._transform_linear(strain_data, bank)
 
-        Logger.info("Converting waveform to dimensionless")
-        waveform_dimensionless = waveform_to_dimensionless(waveform_raw)
+        if self.n_workers > 1:
+            return self._transform_parallel(strain_data, bank)
 
-        all_samples_by_distance: InjectionTransformerData = {distance: [] for distance in self.distances}
+        batches_by_distance = {distance: [] for distance in self.distances}
 
-        for distance in self.distances:
-            Logger.info(f"Processing injections at distance: {distance} kpc")
+        for model in bank.models:
+            for distance in self.distances:
+                Logger.info(f"Processing injections of {model} at distance: {distance} kpc")
 
-            waveform_rescaled = rescale_waveform_amplitude(
-                waveform_dimensionless,
-                distance
-            )
+                for detector in self.detectors:
+                    if detector not in strain_data:
+                        Logger.warning(f"Detector {detector} not found in loaded data, skipping")
+                        continue
+
+                    Logger.info(f"Processing detector {detector} at {distance} kpc")
+                    detector_files = strain_data[detector]
+                    detector_batches = []
+
+                    for file_index, file_data in detector_files.items():
+                        if sum(len(batch) for batch in detector_batches) >= self.n_samples:
+                            break
+
+                        Logger.info(f"Processing file {file_index + 1}/{len(detector_files)}", verbose=False)
+                        detector_batches.append(self._process_file(
+                            file_data,
+                            file_index,
+                            detector,
+                            distance,
+                            bank,
+                            model
+                        ))
+
+                    batches_by_distance[distance].append(WindowBatch.concatenate(detector_batches)[:self.n_samples])
+
+        all_samples_by_distance: InjectionTransformerData = {
+            distance: WindowBatch.concatenate(batches)
+            for distance, batches in batches_by_distance.items()
+        }
+        self._log_summary(all_samples_by_distance, bank)
+        return all_samples_by_distance
 
+    def _transform_parallel(
+        self,
+        strain_data: LoaderData,
+        bank: WaveformBank
+    ) -> InjectionTransformerData:
+        groups = dict()
+        for model in bank.models:
+            for distance in self.distances:
+                for detector in self.detectors:
+                    if detector not in strain_data:
+                        Logger.warning(f"Detector {detector} not found in loaded data, skipping")
+                        continue
+                    groups[(model, distance, detector)] = [
+                        (file_index, file_data, (detector, distance, bank, model))
+                        for file_index, file_data in strain_data[detector].items()
+                    ]
+
+        samples_by_group = run_file_tasks(
+            function=self._process_file,
+            groups=groups,
+            n_samples=self.n_samples,
+            estimate_per_file=lambda file_data: self.n_samples,
+            n_workers=self.n_workers,
+            psd_cache=self.psd_cache
+        )
+
+        all_samples_by_distance: InjectionTransformerData = {
+            distance: WindowBatch.concatenate([
+                samples for (_, group_distance, _), samples in samples_by_group.items()
+                if group_distance == distance and len(samples)
+            ])
+            for distance in self.distances
+        }
+
+        self._log_summary(all_samples_by_distance, bank)
+        return all_samples_by_distance
+
+    def _transform_linear(
+        self,
+        strain_data: LoaderData,
+        bank: WaveformBank
+    ) -> InjectionTransformerData:
+        groups = dict()
+        for detector in self.detectors:
+            if detector not in strain_data:
+                Logger.warning(f"Detector {detector} not found in loaded data, skipping")
+                continue
+            groups[detector] = [
+                (file_index, file_data, (detector, bank, bank.models))
+                for file_index, file_data in strain_data[detector].items()
+            ]
+
+        windows_by_detector = run_file_tasks(
+            function=self._process_file_linear,
+            groups=groups,
+            n_samples=self.n_samples,
+            estimate_per_file=lambda file_data: self.n_samples,
+            n_workers=self.n_workers,
+            psd_cache=self.psd_cache
+        )
+
+        all_samples_by_distance: InjectionTransformerData = {
+            distance: WindowBatch.concatenate([
+                windows[(model, distance)]
+                for model in bank.models
+                for windows in windows_by_detector.values()
+                if windows and (model, distance) in windows
+            ])
+            for distance in self.distances
+        }
+
+        self._log_summary(all_samples_by_distance, bank)
+        return all_samples_by_distance
+
+    def _transform_target(
+        self,
+        strain_data: LoaderData,
+        bank: WaveformBank
+    ) -> InjectionTransformerData:
+        groups = dict()
+        for model in bank.models:
             for detector in self.detectors:
                 if detector not in strain_data:
                     Logger.warning(f"Detector {detector} not found in loaded data, skipping")
                     continue
+                groups[(model, detector)] = [
+                    (file_index, file_data, (detector, bank, model))
+                    for file_index, file_data in strain_data[detector].items()
+                ]
+
+        samples_by_group = run_file_tasks(
+            function=self._process_file_target,
+            groups=groups,
+            n_samples=self.n_samples,
+            estimate_per_file=lambda file_data: self.n_samples,
+            n_workers=self.n_workers,
+            psd_cache=self.psd_cache
+        )
+
+        label = self._target_label()
+        all_samples: InjectionTransformerData = {
+            label: WindowBatch.concatenate([samples for samples in samples_by_group.values() if len(samples)])
+        }
+
+        Logger.info(f"Generated {len(all_samples[label])} samples with target SNR {label}")
+        bank.log_report()
+        self._log_psd_cache()
+        return all_samples
+
+    def transform_stream(self, units: Iterable[InjectionLoaderData], **kwargs) -> Iterator[InjectionTransformerData]:
+        if self.target_snr is not None:
+            yield from self._transform_stream_target(units)
+            return
+
+        if self.linear_distance_scaling:
+            yield from self._transform_stream_linear(units)
+            return
+
+        samples_count = dict()
+        samples_by_distance = {distance: 0 for distance in self.distances}
+        bank = None
+
+        for unit in units:
+            if bank is None:
+                bank = self._prepare_bank(unit)
+
+            for detector, detector_files in unit["strain"].items():
+                if detector not in self.detectors:
+                    continue
+                for file_index, file_data in detector_files.items():
+                    batches = dict()
+                    for model in bank.models:
+                        for distance in self.distances:
+                            key = (model, distance, detector)
+                            remaining = self.n_samples - samples_count.get(key, 0)
+                            if remaining <= 0:
+                                continue
+
+                            Logger.info(f"Processing {detector} file {file_index + 1} with {model} at {distance} kpc", verbose=False)
+                            file_samples = self._process_file(
+                                file_data,
+                                file_index,
+                                detector,
+                                distance,
+                                bank,
+                                model
+                            )[:remaining]
+                            samples_count[key] = samples_count.get(key, 0) + len(file_samples)
+                            samples_by_distance[distance] += len(file_samples)
+                            batches.setdefault(distance, []).append(file_samples)
+
+                    if batches:
+                        yield {distance: WindowBatch.concatenate(batch) for distance, batch in batches.items()}
+
+        for distance in self.distances:
+            Logger.info(f"Generated {samples_by_distance[distance]} samples at {distance} kpc")
+        self._log_psd_cache()
+
+    def _transform_stream_linear(self, units: Iterable[InjectionLoaderData]) -> Iterator[InjectionTransformerData]:
+        samples_count = dict()
+        samples_by_distance = {distance: 0 for distance in self.distances}
+        bank = None
 
-                Logger.info(f"Processing detector {detector} at {distance} kpc")
-                detector_files = strain_data[detector]
-                detector_samples = []
+        for unit in units:
+            if bank is None:
+                bank = self._prepare_bank(unit)
 
+            for detector, detector_files in unit["strain"].items():
+                if detector not in self.detectors:
+                    continue
                 for file_index, file_data in detector_files.items():
-                    if len(detector_samples) >= self.n_samples:
-                        break
-
-                    Logger.info(f"Processing file {file_index + 1}/{len(detector_files)}", verbose=False)
-
-                    strain = file_data["strain"]
-                    sample_duration_seconds = file_data["time_sampling"]
-                    gps_start = file_data["gps_start"]
-                    sampling_frequency = 1.0 / sample_duration_seconds
-
-                    n_injections_possible = len(
-                        WaveformInjector._calculate_injection_positions(
-                            strain_length=len(strain),
-                            injection_interval_seconds=self.injection_interval_seconds,
-                            sampling_frequency=sampling_frequency,
-                            use_first_half=self.use_first_half
-                        )
-                    )
-
-                    if self.n_samples > n_injections_possible:
-                        Logger.warning(
-                            f"n_samples ({self.n_samples}) > injections possible ({n_injections_possible}), "
-                            f"will only generate {n_injections_possible} samples per file"
-                        )
-
-                    time_wf_resampled, waveform_resampled = resample_waveform(
-                        time_wf,
-                        waveform_rescaled,
-                        sampling_frequency
-                    )
-
-                    if waveform_resampled is None:
-                        Logger.error(f"Failed to resample waveform for file {file_index}, skipping")
+                    models = [
+                        model for model in bank.models
+                        if samples_count.get((model, detector), 0) < self.n_samples
+                    ]
+                    if not models:
                         continue
 
-                    Logger.info("Injecting waveforms into noise", verbose=False)
-                    strain_with_injections, injection_log = WaveformInjector.inject_waveforms(
-                        strain_noise=strain,
-                        waveform=waveform_resampled,
-                        injection_interval_seconds=self.injection_interval_seconds,
-                        sampling_frequency=sampling_frequency,
-                        sample_duration_seconds=sample_duration_seconds,
-                        n_injections=self.n_samples + 2,
-                        use_first_half=self.use_first_half
-                    )
-
-                    Logger.info("Applying whitening", verbose=False)
-                    whitened_strain, _, _, _ = whitening(
-                        strain_with_injections,
-                        self.whitening_cut,
-                        self.whitening_window,
-                        sample_duration_seconds
-                    )
-
-                    Logger.info("Applying band-pass filter", verbose=False)
-                    filtered_strain, _ = bandpass(
-                        whitened_strain,
-                        self.bandpass_fmin,
-                        self.bandpass_fmax,
-                        sample_duration_seconds
-                    )
-
-                    Logger.info("Creating windowed samples", verbose=False)
-                    file_samples = self._create_windows(
-                        filtered_strain,
-                        sample_duration_seconds,
-                        gps_start,
-                        file_index,
-                        detector,
-                        distance,
-                        injection_log
-                    )
-                    detector_samples.extend(file_samples)
-
-                detector_samples = detector_samples[:self.n_samples]
-                all_samples_by_distance[distance].extend(detector_samples)
+                    Logger.info(f"Processing {detector} file {file_index + 1} with {len(models)} models", verbose=False)
+                    windows = self._process_file_linear(file_data, file_index, detector, bank, models)
+
+                    batches = {distance: [] for distance in self.distances}
+                    for model in models:
+                        remaining = self.n_samples - samples_count.get((model, detector), 0)
+                        model_windows = {distance: windows[(model, distance)][:remaining] for distance in self.distances}
+                        samples_count[(model, detector)] = samples_count.get((model, detector), 0) + batch_length(model_windows)
+                        for distance, samples in model_windows.items():
+                            samples_by_distance[distance] += len(samples)
+                            batches[distance].append(samples)
+                    yield {distance: WindowBatch.concatenate(samples) for distance, samples in batches.items()}
 
+        for distance in self.distances:
+            Logger.info(f"Generated {samples_by_distance[distance]} samples at {distance} kpc")
+        self._log_psd_cache()
+
+    def _transform_stream_target(self, units: Iterable[InjectionLoaderData]) -> Iterator[InjectionTransformerData]:
+        samples_count = dict()
+        label = self._target_label()
+        bank = None
+
+        for unit in units:
+            if bank is None:
+                bank = self._prepare_bank(unit)
+
+            for detector, detector_files in unit["strain"].items():
+                if detector not in self.detectors:
+                    continue
+                for file_index, file_data in detector_files.items():
+                    batches = []
+                    for model in bank.models:
+                        remaining = self.n_samples - samples_count.get((model, detector), 0)
+                        if remaining <= 0:
+                            continue
+
+                        Logger.info(f"Processing {detector} file {file_index + 1} with {model}", verbose=False)
+                        file_samples = self._process_file_target(
+                            file_data,
+                            file_index,
+                            detector,
+                            bank,
+                            model
+                        )[:remaining]
+                        samples_count[(model, detector)] = samples_count.get((model, detector), 0) + len(file_samples)
+                        batches.append(file_samples)
+                    if batches:
+                        yield {label: WindowBatch.concatenate(batches)}
+
+        Logger.info(f"Generated {sum(samples_count.values())} samples with target SNR {label}")
+        self._log_psd_cache()
+
+    def _validate_target_snr(self) -> None:
+        edges = np.asarray(self.target_snr, dtype=np.float64)
+        if len(edges) < 2 or edges[0] <= 0 or np.any(np.diff(edges) <= 0):
+            raise ValueError(f"target_snr must be increasing positive SNR bin edges, got {self.target_snr}")
+        if self.target_snr_weights is None:
+            if len(edges) != 2:
+                raise ValueError("target_snr with more than two edges needs target_snr_weights")
+        elif len(self.target_snr_weights) != len(edges) - 1 or min(self.target_snr_weights) < 0 or sum(self.target_snr_weights) <= 0:
+            raise ValueError(
+                f"target_snr_weights must hold one non-negative weight per SNR bin ({len(edges) - 1}), "
+                f"got {self.target_snr_weights}"
+            )
+
+    def _target_label(self) -> str:
+        return f"snr_{self.target_snr[0]:g}-{self.target_snr[-1]:g}"
+
+    def _draw_target_snrs(self, n_snrs: int, rng: np.random.Generator) -> NDArray[np.float64]:
+        edges = np.asarray(self.target_snr, dtype=np.float64)
+        weights = np.ones(1) if self.target_snr_weights is None else np.asarray(self.target_snr_weights, dtype=np.float64)
+        bins = rng.choice(len(weights), size=n_snrs, p=weights / weights.sum())
+        return rng.uniform(edges[bins], edges[bins + 1])
+
+    def _prepare_bank(self, data: InjectionLoaderData) -> WaveformBank:
+        bank = data.get("bank") or WaveformBank(waveforms={"waveform": data["waveform"]})
+
+        for model in bank.models:
+            waveform_duration = bank.duration(model)
+            if self.window_size <= waveform_duration:
+                raise ValueError(
+                    f"window_size ({self.window_size}s) must be greater than "
+                    f"waveform_duration ({waveform_duration:.4f}s) of {model}"
+                )
+
+        Logger.info(f"Injecting {len(bank.models)} waveform models")
+        return bank
+
+    def _log_summary(self, all_samples_by_distance: InjectionTransformerData, bank: WaveformBank) -> None:
         for distance in self.distances:
             Logger.info(f"Generated {len(all_samples_by_distance[distance])} samples at {distance} kpc")
+        bank.log_report()
+        self._log_psd_cache()
 
-        return all_samples_by_distance
+    def _process_file(
+        self,
+        file_data: GWOSCFileData,
+        file_index: int,
+        detector: str,
+        distance: float,
+        bank: WaveformBank,
+        model: str
+    ) -> WindowBatch:
+        strain = np.asarray(file_data["strain"])
+        sample_duration_seconds = file_data["time_sampling"]
+        gps_start = file_data["gps_start"]
+        sampling_frequency = 1.0 / sample_duration_seconds
+        file_length = int(round(file_data["duration"] / sample_duration_seconds))
+        offset = file_data.get("offset", 0)
+
+        n_injections_possible = len(
+            WaveformInjector._calculate_injection_positions(
+                strain_length=file_length,
+                injection_interval_seconds=self.injection_interval_seconds,
+                sampling_frequency=sampling_frequency,
+                use_first_half=self.use_first_half
+            )
+        )
+
+        if self.n_samples > n_injections_possible:
+            Logger.warning(
+                f"n_samples ({self.n_samples}) > injections possible ({n_injections_possible}), "
+                f"will only generate {n_injections_possible} samples per file"
+            )
+
+        _, template = bank.template(model, self.polarization, sampling_frequency)
+        waveform_rescaled = rescale_waveform_amplitude(template, distance)
+
+        Logger.info("Injecting waveforms into noise", verbose=False)
+        strain_with_injections, injection_log = WaveformInjector.inject_waveforms(
+            strain_noise=strain,
+            waveform=waveform_rescaled,
+            injection_interval_seconds=self.injection_interval_seconds,
+            sampling_frequency=sampling_frequency,
+            sample_duration_seconds=sample_duration_seconds,
+            n_injections=self._injections_needed(),
+            use_first_half=self.use_first_half,
+            sample_offset=offset,
+            total_length=file_length,
+            psd_cache=self.psd_cache,
+            detector=detector,
+            gps_start=gps_start,
+            source_id=file_data.get("source_id"),
+            snr_method=self.snr_method,
+            out=self.workspace.buffer(len(strain))
+        )
+
+        Logger.info(f"Whitening and band-passing with the {self.preprocessing_engine} engine", verbose=False)
+        filtered_strain = self._preprocess(
+            strain_with_injections,
+            sample_duration_seconds,
+            offset * sample_duration_seconds
+        ).strain
+
+        Logger.info("Creating windowed samples", verbose=False)
+        return self._create_windows(
+            filtered_strain,
+            sample_duration_seconds,
+            gps_start,
+            file_index,
+            detector,
+            distance,
+            injection_log,
+            model
+        )
+
+    def _process_file_linear(
+        self,
+        file_data: GWOSCFileData,
+        file_index: int,
+        detector: str,
+        bank: WaveformBank,
+        models: List[str]
+    ) -> Dict[Tuple[str, float], WindowBatch]:
+        strain = np.asarray(file_data["strain"])
+        sample_duration_seconds = file_data["time_sampling"]
+        gps_start = file_data["gps_start"]
+        sampling_frequency = 1.0 / sample_duration_seconds
+        file_length = int(round(file_data["duration"] / sample_duration_seconds))
+        offset = file_data.get("offset", 0)
+        epoch = offset * sample_duration_seconds
+        reference_distance = constants.default_kpc_distance
+
+        Logger.info("Whitening and band-passing noise", verbose=False)
+        noise = self._preprocess(
+            strain,
+            sample_duration_seconds,
+            epoch,
+            detector=detector,
+            gps_start=gps_start + epoch,
+            source_id=file_data.get("source_id")
+        )
+        filtered_noise = noise.strain
+
+        windows = dict()
+        for model in models:
+            _, template = bank.template(model, self.polarization, sampling_frequency)
+            waveform_reference = rescale_waveform_amplitude(template, reference_distance)
+
+            Logger.info(f"Injecting {model} into noise at reference distance {reference_distance} kpc", verbose=False)
+            signal, injection_log = WaveformInjector.inject_waveforms(
+                strain_noise=strain,
+                waveform=waveform_reference,
+                injection_interval_seconds=self.injection_interval_seconds,
+                sampling_frequency=sampling_frequency,
+                sample_duration_seconds=sample_duration_seconds,
+                n_injections=self._injections_needed(),
+                use_first_half=self.use_first_half,
+                sample_offset=offset,
+                total_length=file_length,
+                psd_cache=self.psd_cache,
+                detector=detector,
+                gps_start=gps_start,
+                source_id=file_data.get("source_id"),
+                snr_method=self.snr_method,
+                out=self.workspace.buffer(len(strain))
+            )
+            signal -= strain
+
+            Logger.info("Whitening and band-passing injected signal with the noise PSD", verbose=False)
+            filtered_signal = self._preprocess(
+                signal,
+                sample_duration_seconds,
+                epoch,
+                psd=noise.psd,
+                scaling_factor=noise.scaling_factor
+            ).strain
+            del signal
+
+            snrs_by_distance = WaveformInjector.snr_by_distance(
+                [entry["snr"] for entry in injection_log],
+                reference_distance,
+                self.distances
+            )
+
+            for distance in self.distances:
+                amplitude = reference_distance / distance
+                distance_log = [
+                    dict(entry, snr=float(snr))
+                    for entry, snr in zip(injection_log, snrs_by_distance[distance])
+                ]
+                windows[(model, distance)] = self._create_windows(
+                    filtered_noise + filtered_signal * amplitude,
+                    sample_duration_seconds,
+                    gps_start,
+                    file_index,
+                    detector,
+                    distance,
+                    distance_log,
+                    model
+                )
+
+        return windows
+
+    def _process_file_target(
+        self,
+        file_data: GWOSCFileData,
+        file_index: int,
+        detector: str,
+        bank: WaveformBank,
+        model: str
+    ) -> WindowBatch:
+        strain = np.asarray(file_data["strain"])
+        sample_duration_seconds = file_data["time_sampling"]
+        gps_start = file_data["gps_start"]
+        sampling_frequency = 1.0 / sample_duration_seconds
+        file_length = int(round(file_data["duration"] / sample_duration_seconds))
+        offset = file_data.get("offset", 0)
+        reference_distance = constants.default_kpc_distance
+
+        _, template = bank.template(model, self.polarization, sampling_frequency)
+        waveform_reference = rescale_waveform_amplitude(template, reference_distance)
+
+        positions = WaveformInjector.injection_positions(
+            strain_length=len(strain),
+            waveform_length=len(waveform_reference),
+            injection_interval_seconds=self.injection_interval_seconds,
+            sampling_frequency=sampling_frequency,
+            n_injections=self._injections_needed(),
+            use_first_half=self.use_first_half,
+            sample_offset=offset,
+            total_length=file_length
+        )
+
+        Logger.info(f"Computing reference SNRs of {model} at {reference_distance} kpc", verbose=False)
+        reference_snrs = WaveformInjector.calculate_snr_batch(
+            waveform=waveform_reference,
+            strain=strain,
+            injection_indices=positions - offset,
+            sample_duration_seconds=sample_duration_seconds
+        )
+        valid = reference_snrs > 0
+        if not np.all(valid):
+            Logger.warning(f"Skipping {np.count_nonzero(~valid)} injections with zero reference SNR")
+        positions, reference_snrs = positions[valid], reference_snrs[valid]
+
+        seed = None if self.seed is None else [self.seed, file_index, self.detectors.index(detector), bank.models.index(model)]
+        target_snrs = self._draw_target_snrs(len(positions), np.random.default_rng(seed))
+        amplitudes = target_snrs / reference_snrs
+
+        Logger.info(f"Injecting {len(positions)} waveforms with SNRs drawn from {self._target_label()}", verbose=False)
+        strain_with_injections = self.workspace.buffer(len(strain))[:len(strain)]
+        np.copyto(strain_with_injections, strain)
+        WaveformInjector.add_injections(strain_with_injections, waveform_reference, positions - offset, amplitudes)
+
+        waveform_duration_seconds = len(waveform_reference) * sample_duration_seconds
+        injection_log = [
+            {
+                "time_inj": sample_index / sampling_frequency,
+                "snr": float(snr),
+                "waveform_duration": waveform_duration_seconds,
+                "distance": float(reference_distance / amplitude)
+            }
+            for sample_index, snr, amplitude in zip(positions, target_snrs, amplitudes)
+        ]
+
+        Logger.info(f"Whitening and band-passing with the {self.preprocessing_engine} engine", verbose=False)
+        filtered_strain = self._preprocess(
+            strain_with_injections,
+            sample_duration_seconds,
+            offset * sample_duration_seconds
+        ).strain
+
+        return self._create_windows(
+            filtered_strain,
+            sample_duration_seconds,
+            gps_start,
+            file_index,
+            detector,
+            None,
+            injection_log,
+            model
+        )
+
+    def _preprocess(
+        self,
+        strain: NDArray[np.float64],
+        delta_t: float,
+        epoch: float,
+        psd: FrequencySeries = None,
+        scaling_factor: float = None,
+        detector: str = None,
+        gps_start: float = None,
+        source_id: str = None
+    ) -> WhiteningResult:
+        return preprocess(
+            strain,
+            self.whitening_cut,
+            self.whitening_window,
+            delta_t,
+            self.bandpass_fmin,
+            self.bandpass_fmax,
+            epoch=epoch,
+            psd=psd,
+            scaling_factor=scaling_factor,
+            engine=self.preprocessing_engine,
+            taper=self.taper,
+            normalization=self.normalization,
+            block_duration=self.block_duration,
+            psd_cache=self.psd_cache,
+            detector=detector,
+            gps_start=gps_start,
+            source_id=source_id
+        )
+
+    def _log_psd_cache(self) -> None:
+        if self.psd_cache is not None:
+            self.psd_cache.log_report()
 
     def _create_windows(
         self,
@@ -150,47 +691,71 @@ class InjectionTransformer(TransformerBase):
         file_index: int,
         detector: str,
         distance: float,
-        injection_log: List[Dict]
-    ) -> List[InjectionWindowedSample]:
+        injection_log: List[Dict],
+        model: str = None
+    ) -> WindowBatch:
 
-        time_strain_cut = s.sample_times
+        time_strain_cut = s.sample_times.numpy()
         sample_points = int(self.window_size / delta_t)
 
-        Twin_ini = []
-        filtered_log = []
-
-        for log_entry in injection_log:
-            twin_start = log_entry["time_inj"] + 0.5 * (log_entry["waveform_duration"] - self.window_size)
-
-            if twin_start >= time_strain_cut[0]:
-                Twin_ini.append(twin_start)
-                filtered_log.append(log_entry)
-
-        locate_win = []
-        for twin_start in Twin_ini:
-            index = int(twin_start / delta_t) - int(time_strain_cut[0] / delta_t)
-            locate_win.append(index)
-
-        samples = []
-        for j in range(len(filtered_log)):
-            start = locate_win[j]
-            end = start + sample_points
-
-            if end > len(s):
-                Logger.warning(f"Window {j} exceeds strain length, skipping", verbose=False)
-                continue
-
-            sample: InjectionWindowedSample = {
-                "time": np.array(time_strain_cut[start:end]),
-                "strain": np.array(s[start:end]),
-                "sample_index": j,
-                "file_index": file_index,
-                "detector": detector,
-                "gps_start": gps_start,
-                "distance": distance,
-                "snr": filtered_log[j]["snr"],
-                "injection_time": filtered_log[j]["time_inj"]
-            }
-            samples.append(sample)
-
-        return samples
+        injection_times = np.array([entry["time_inj"] for entry in injection_log], dtype=np.float64)
+        waveform_durations = np.array([entry["waveform_duration"] for entry in injection_log], dtype=np.float64)
+        twin_starts = injection_times + 0.5 * (waveform_durations - self.window_size)
+
+        filtered = np.flatnonzero(twin_starts >= time_strain_cut[0])
+        starts = (twin_starts[filtered] / delta_t).astype(np.int64) - int(time_strain_cut[0] / delta_t)
+
+        fits = starts + sample_points <= len(s)
+        for j in np.flatnonzero(~fits):
+            Logger.warning(f"Window {j} exceeds strain length, skipping", verbose=False)
+        kept = filtered[fits]
+        starts = starts[fits]
+        sample_indices = np.flatnonzero(fits)
+
+        if self.window_offsets:
+            seed = None if self.seed is None else [self.seed, file_index, self.detectors.index(detector)]
+            starts = self._offset_starts(
+                starts,
+                waveform_durations[kept],
+                len(s),
+                sample_points,
+                delta_t,
+                np.random.default_rng(seed)
+            )
+            kept = np.repeat(kept, 1 + self.window_offsets)
+            sample_indices = np.repeat(sample_indices, 1 + self.window_offsets)
+
+        return WindowBatch.from_windows(
+            s.numpy(),
+            time_strain_cut,
+            delta_t,
+            starts,
+            sample_points,
+            sample_indices,
+            file_index,
+            detector,
+            gps_start,
+            distances=np.array([injection_log[i].get("distance", distance) for i in kept], dtype=np.float64),
+            snrs=np.array([injection_log[i]["snr"] for i in kept], dtype=np.float64),
+            injection_times=injection_times[kept],
+            models=None if model is None else np.full(len(kept), model.encode())
+        )
+
+    def _offset_starts(
+        self,
+        starts: NDArray[np.int64],
+        waveform_durations: NDArray[np.float64],
+        n_points: int,
+        window_points: int,
+        delta_t: float,
+        rng: np.random.Generator
+    ) -> NDArray[np.int64]:
+        if self.max_window_offset is not None:
+            max_offsets = np.full(len(starts), self.max_window_offset)
+        else:
+            max_offsets = np.maximum(0.0, 0.5 * (self.window_size - waveform_durations))
+        max_shifts = (max_offsets / delta_t).astype(np.int64)[:, None]
+
+        shifts = rng.integers(-max_shifts, max_shifts + 1, size=(len(starts), self.window_offsets))
+        shifted = np.clip(starts[:, None] + shifts, 0, n_points - window_points)
+        return np.concatenate([starts[:, None], shifted], axis=1).ravel()
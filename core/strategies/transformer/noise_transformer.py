@@ -1,11 +1,18 @@
-from typing import List
+import math
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 import numpy as np
 from dataclasses import dataclass
 
+import core.constants.gw_constants as constants
 from core.strategies.base.transformer import TransformerBase
-from core.types import LoaderData, TransformerData, WindowedSample
+from core.types import GWOSCFileData, LoaderData, TransformerData, WindowBatch
+from core.handlers.psd_cache import PSDCache
 from core.utils.logger import Logger
-from core.utils.preprocessing import whitening, bandpass
+from core.utils.preprocessing import preprocess
+from core.utils.block_whitener import BlockWhitener, whiten_contiguous
+from core.utils.parallel import run_file_tasks
+from core.utils.streaming import concatenate_batches
 
 @dataclass
 class NoiseTransformer(TransformerBase):
@@ -17,9 +24,47 @@ class NoiseTransformer(TransformerBase):
     bandpass_fmax: float = 1600
     n_samples: int = 1
     use_second_half: bool = True
+    read_partial: bool = True
+    span_padding: float = 8.0
+    n_workers: int = 1
+    preprocessing_engine: str = "pycbc"
+    taper: str = "tukey"
+    normalization: str = "diagnostic"
+    block_duration: float = 64.0
+    stitch_files: bool = False
+    psd_decay: float = 0.9
+    psd_cache_dir: str = None
+    psd_cache_entries: int = 256
+    window_stride: float = None
+    file_duration: float = constants.gwosc_file_duration
+
+    def __post_init__(self):
+        self.psd_cache = PSDCache(self.psd_cache_dir, self.psd_cache_entries) if self.psd_cache_dir else None
+
+    def loading_hints(self) -> Dict[str, Any]:
+        hints = {"n_files": self._files_needed(self.file_duration)}
+        if self.stitch_files or not (self.read_partial and self.use_second_half):
+            return hints
+        hints["span"] = {
+            "start_fraction": 0.5,
+            "end_fraction": 1.0,
+            "padding_seconds": self.whitening_cut / 2 + self.span_padding
+        }
+        return hints
 
     def transform(self, data: LoaderData, **kwargs) -> TransformerData:
-        all_samples = []
+        if self.stitch_files:
+            files = (
+                (detector, file_index, file_data)
+                for detector in self.detectors if detector in data
+                for file_index, file_data in data[detector].items()
+            )
+            return concatenate_batches(list(self._transform_stitched(files)))
+
+        if self.n_workers > 1:
+            return self._transform_parallel(data)
+
+        batches = []
 
         for detector in self.detectors:
             if detector not in data:
@@ -28,50 +73,181 @@ class NoiseTransformer(TransformerBase):
 
             Logger.info(f"Processing noise data for detector {detector}")
             detector_files = data[detector]
-            detector_samples = []
+            detector_batches = []
 
             for file_index, file_data in detector_files.items():
-                if len(detector_samples) >= self.n_samples:
+                if sum(len(batch) for batch in detector_batches) >= self.n_samples:
                     break
 
                 Logger.info(f"Processing file {file_index + 1}/{len(detector_files)}", verbose=False)
-                strain = file_data["strain"]
+                detector_batches.append(self._process_file(file_data, file_index, detector))
+
+            batches.append(WindowBatch.concatenate(detector_batches)[:self.n_samples])
+
+        all_samples = WindowBatch.concatenate(batches)
+        Logger.info(f"Generated {len(all_samples)} total windowed samples")
+        self._log_psd_cache()
+        return all_samples
+
+    def _transform_parallel(self, data: LoaderData) -> TransformerData:
+        groups = dict()
+        for detector in self.detectors:
+            if detector not in data:
+                Logger.warning(f"Detector {detector} not found in loaded data, skipping")
+                continue
+            groups[detector] = [
+                (file_index, file_data, (detector,))
+                for file_index, file_data in data[detector].items()
+            ]
+
+        samples_by_detector = run_file_tasks(
+            function=self._process_file,
+            groups=groups,
+            n_samples=self.n_samples,
+            estimate_per_file=self._estimate_windows_per_file,
+            n_workers=self.n_workers,
+            psd_cache=self.psd_cache
+        )
+        all_samples = WindowBatch.concatenate(list(samples_by_detector.values()))
+
+        Logger.info(f"Generated {len(all_samples)} total windowed samples")
+        self._log_psd_cache()
+        return all_samples
+
+    def _estimate_windows_per_file(self, file_data: GWOSCFileData) -> int:
+        return self._windows_per_file(file_data["duration"])
+
+    def _windows_per_file(self, duration: float) -> int:
+        usable_duration = duration - self.whitening_cut
+        if self.use_second_half:
+            usable_duration = duration / 2 - self.whitening_cut / 2
+        if usable_duration < self.window_size:
+            return 0
+        return int((usable_duration - self.window_size) / (self.window_stride or self.window_size)) + 1
+
+    def _files_needed(self, duration: float) -> int:
+        return math.ceil(self.n_samples / max(1, self._windows_per_file(duration)))
+
+    def transform_stream(self, units: Iterable[LoaderData], **kwargs) -> Iterator[TransformerData]:
+        if self.stitch_files:
+            files = (
+                (detector, file_index, file_data)
+                for unit in units
+                for detector, detector_files in unit.items()
+                for file_index, file_data in detector_files.items()
+            )
+            yield from self._transform_stitched(files)
+            return
+
+        samples_per_detector = {detector: 0 for detector in self.detectors}
+
+        for unit in units:
+            for detector, detector_files in unit.items():
+                if detector not in samples_per_detector:
+                    continue
+                for file_index, file_data in detector_files.items():
+                    remaining = self.n_samples - samples_per_detector[detector]
+                    if remaining <= 0:
+                        continue
+
+                    Logger.info(f"Processing {detector} file {file_index + 1}", verbose=False)
+                    file_samples = self._process_file(file_data, file_index, detector)[:remaining]
+                    samples_per_detector[detector] += len(file_samples)
+                    yield file_samples
+
+        Logger.info(f"Generated {sum(samples_per_detector.values())} total windowed samples")
+        self._log_psd_cache()
+
+    def _transform_stitched(self, files: Iterable[Tuple[str, int, GWOSCFileData]]) -> Iterator[WindowBatch]:
+        samples_per_detector = {detector: 0 for detector in self.detectors}
+
+        for detector, detector_files in groupby(files, key=lambda item: item[0]):
+            if detector not in samples_per_detector:
+                Logger.warning(f"Detector {detector} not in configured detectors, skipping")
+                continue
+
+            Logger.info(f"Whitening {detector} files as a continuous stream")
+            whitened_files = whiten_contiguous(
+                ((file_index, file_data) for _, file_index, file_data in detector_files),
+                self._block_whitener
+            )
+            for file_index, file_data, filtered_strain in whitened_files:
+                remaining = self.n_samples - samples_per_detector[detector]
+                if remaining <= 0:
+                    break
+
                 ts = file_data["time_sampling"]
-                gps_start = file_data["gps_start"]
-
-                strain_copy = np.copy(strain)
-
-                Logger.info("Starting whitening process", verbose=False)
-                whitened_strain, _, _, _ = whitening(
-                    strain_copy,
-                    self.whitening_cut,
-                    self.whitening_window,
-                    ts
-                )
-
-                Logger.info("Applying band-pass filter", verbose=False)
-                filtered_strain, _ = bandpass(
-                    whitened_strain,
-                    self.bandpass_fmin,
-                    self.bandpass_fmax,
-                    ts
-                )
-
-                Logger.info("Creating windowed samples", verbose=False)
                 file_samples = self._create_windows(
                     filtered_strain,
                     ts,
-                    gps_start,
+                    file_data["gps_start"],
                     file_index,
-                    detector
-                )
-                detector_samples.extend(file_samples)
+                    detector,
+                    int(round(file_data["duration"] / ts))
+                )[:remaining]
+                samples_per_detector[detector] += len(file_samples)
+                yield file_samples
 
-            detector_samples = detector_samples[:self.n_samples]
-            all_samples.extend(detector_samples)
+        Logger.info(f"Generated {sum(samples_per_detector.values())} total windowed samples")
+        self._log_psd_cache()
 
-        Logger.info(f"Generated {len(all_samples)} total windowed samples")
-        return all_samples
+    def _block_whitener(self, delta_t: float) -> BlockWhitener:
+        return BlockWhitener(
+            delta_t,
+            filter_duration=self.whitening_cut,
+            lowcut=self.bandpass_fmin,
+            highcut=self.bandpass_fmax,
+            psd_segment_duration=self.whitening_window,
+            psd_decay=self.psd_decay,
+            block_duration=self.block_duration
+        )
+
+    def _log_psd_cache(self) -> None:
+        if self.psd_cache is not None:
+            self.psd_cache.log_report()
+
+    def _process_file(
+        self,
+        file_data: GWOSCFileData,
+        file_index: int,
+        detector: str
+    ) -> WindowBatch:
+        strain = file_data["strain"]
+        ts = file_data["time_sampling"]
+        gps_start = file_data["gps_start"]
+        file_length = int(round(file_data["duration"] / ts))
+        offset = file_data.get("offset", 0)
+
+        strain_copy = np.copy(strain)
+
+        Logger.info(f"Whitening and band-passing with the {self.preprocessing_engine} engine", verbose=False)
+        filtered_strain = preprocess(
+            strain_copy,
+            self.whitening_cut,
+            self.whitening_window,
+            ts,
+            self.bandpass_fmin,
+            self.bandpass_fmax,
+            epoch=offset * ts,
+            engine=self.preprocessing_engine,
+            taper=self.taper,
+            normalization=self.normalization,
+            block_duration=self.block_duration,
+            psd_cache=self.psd_cache,
+            detector=detector,
+            gps_start=gps_start + offset * ts,
+            source_id=file_data.get("source_id")
+        ).strain
+
+        Logger.info("Creating windowed samples", verbose=False)
+        return self._create_windows(
+            filtered_strain,
+            ts,
+            gps_start,
+            file_index,
+            detector,
+            file_length
+        )
 
     def _create_windows(
         self,
@@ -79,18 +255,18 @@ class NoiseTransformer(TransformerBase):
         delta_t: float,
         gps_start: float,
         file_index: int,
-        detector: str
-    ) -> List[WindowedSample]:
-        time_strain = strain.sample_times
+        detector: str,
+        file_length: int
+    ) -> WindowBatch:
         sample_points = int(self.window_size / delta_t)
 
         total_samples = len(strain)
 
         if self.use_second_half:
             Logger.warning("Using only second half of strain for noise samples")
-            half_samples = total_samples // 2
-            start_index_offset = half_samples
-            available_samples = total_samples - half_samples
+            half_time = (file_length // 2) * delta_t
+            start_index_offset = max(0, int(round((half_time - float(strain.start_time)) / delta_t)))
+            available_samples = total_samples - start_index_offset
         else:
             Logger.warning("Using entire strain for noise samples")
             start_index_offset = 0
@@ -101,25 +277,23 @@ class NoiseTransformer(TransformerBase):
 
         if n_possible_samples == 0:
             Logger.warning("Insufficient data for even one window sample")
-            return []
-
-        samples = []
-        for i in range(n_possible_samples):
-            start_index = start_index_offset + i * sample_points
-            end_index = start_index + sample_points
-
-            if end_index > len(strain):
-                Logger.warning(f"Window {i} exceeds strain length, stopping", verbose=False)
-                break
-
-            sample: WindowedSample = {
-                "time": np.array(time_strain[start_index:end_index]),
-                "strain": np.array(strain[start_index:end_index]),
-                "sample_index": i,
-                "file_index": file_index,
-                "detector": detector,
-                "gps_start": gps_start
-            }
-            samples.append(sample)
-
-        return samples
+            return WindowBatch.empty()
+
+        stride_points = sample_points if self.window_stride is None else max(1, int(round(self.window_stride / delta_t)))
+        n_windows = max(0, (total_samples - start_index_offset - sample_points) // stride_points + 1)
+        if stride_points == sample_points:
+            if n_windows < n_possible_samples:
+                Logger.warning(f"Window {n_windows} exceeds strain length, stopping", verbose=False)
+            n_windows = min(n_windows, n_possible_samples)
+
+        return WindowBatch.from_windows(
+            strain.numpy(),
+            strain.sample_times.numpy(),
+            delta_t,
+            start_index_offset + np.arange(n_windows) * stride_points,
+            sample_points,
+            np.arange(n_windows),
+            file_index,
+            detector,
+            gps_start
+        )
@@ -1,4 +1,6 @@
 from .custom_types import (
+    StrainArray,
+    StrainSpan,
     LoaderData,
     DetectorData,
     GWOSCFileData,
@@ -10,10 +12,14 @@ from .custom_types import (
     ExporterData,
     InjectionInfo,
     InjectionWindowedSample,
-    InjectionTransformerData
+    InjectionTransformerData,
+    CombinedTransformerData
 )
+from .window_batch import WindowBatch
 
 __all__ = [
+    'StrainArray',
+    'StrainSpan',
     'LoaderData',
     'DetectorData',
     'GWOSCFileData',
@@ -25,5 +31,7 @@ __all__ = [
     'ExporterData',
     'InjectionInfo',
     'InjectionWindowedSample',
-    'InjectionTransformerData'
+    'InjectionTransformerData',
+    'CombinedTransformerData',
+    'WindowBatch'
 ]
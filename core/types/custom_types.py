@@ -1,18 +1,33 @@
-from typing import TypedDict, Dict, List, TYPE_CHECKING
+from typing import TypedDict, Dict, List, Union, TYPE_CHECKING
 from numpy.typing import NDArray
 import numpy as np
 
+from core.types.window_batch import WindowBatch
+
 if TYPE_CHECKING:
     import pycbc.types
     import pycbc.types.frequencyseries
+    from core.utils.lazy_strain import LazyStrain
+    from core.handlers.waveform_bank import WaveformBank
+
+
+StrainArray = Union[NDArray[np.float64], "LazyStrain"]
+
+
+class StrainSpan(TypedDict):
+    start_fraction: float
+    end_fraction: float
+    padding_seconds: float
 
 
 class GWOSCFileData(TypedDict):
-    strain: NDArray[np.float64]
+    strain: StrainArray
     gps_start: float
     duration: float
     time_sampling: float
     delta_t: float
+    offset: int
+    source_id: str
 
 
 LoaderData = Dict[str, Dict[int, GWOSCFileData]]
@@ -28,6 +43,7 @@ class WaveformData(TypedDict):
 class InjectionLoaderData(TypedDict):
     strain: LoaderData
     waveform: WaveformData
+    bank: "WaveformBank"
 
 
 class ProcessedNoiseData(TypedDict):
@@ -47,7 +63,7 @@ class WindowedSample(TypedDict):
     gps_start: float
 
 
-TransformerData = List[WindowedSample]
+TransformerData = WindowBatch
 ExporterData = None
 
 
@@ -67,6 +83,8 @@ class InjectionWindowedSample(TypedDict):
     distance: float
     snr: float
     injection_time: float
+    model: str
 
 
-InjectionTransformerData = Dict[float, List[InjectionWindowedSample]]
+InjectionTransformerData = Dict[float, WindowBatch]
+CombinedTransformerData = Dict[Union[str, float], WindowBatch]
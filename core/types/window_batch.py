@@ -0,0 +1,196 @@
+import numpy as np
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Sequence, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from numpy.typing import NDArray
+
+
+@dataclass
+class WindowBatch:
+    t0s: NDArray[np.float64]
+    strains: NDArray[np.float64]
+    sample_indices: NDArray[np.int32]
+    file_indices: NDArray[np.int32]
+    detector_codes: NDArray[np.int8]
+    gps_starts: NDArray[np.float64]
+    detector_names: Tuple[str, ...] = ()
+    delta_t: float = None
+    distances: NDArray[np.float64] = None
+    snrs: NDArray[np.float64] = None
+    injection_times: NDArray[np.float64] = None
+    models: NDArray[np.bytes_] = None
+
+    ROW_FIELDS = (
+        "t0s",
+        "strains",
+        "sample_indices",
+        "file_indices",
+        "detector_codes",
+        "gps_starts",
+        "distances",
+        "snrs",
+        "injection_times",
+        "models"
+    )
+    INJECTION_FIELDS = ("distances", "snrs", "injection_times")
+
+    def __len__(self) -> int:
+        return len(self.strains)
+
+    def __getitem__(self, index: Any) -> "WindowBatch":
+        if isinstance(index, (int, np.integer)):
+            index = [index]
+        return replace(self, **{
+            name: getattr(self, name)[index]
+            for name in self.ROW_FIELDS
+            if getattr(self, name) is not None
+        })
+
+    @property
+    def times(self) -> NDArray[np.float64]:
+        return self.t0s[:, None] + np.arange(self.strains.shape[1]) * self.delta_t
+
+    @property
+    def window_duration(self) -> float:
+        return (self.strains.shape[1] - 1) * self.delta_t
+
+    @property
+    def detectors(self) -> NDArray[np.bytes_]:
+        return np.array(self.detector_names, dtype='S10')[self.detector_codes]
+
+    @property
+    def has_injections(self) -> bool:
+        return self.snrs is not None
+
+    @classmethod
+    def from_windows(
+        cls,
+        strain: NDArray[np.float64],
+        times: NDArray[np.float64],
+        delta_t: float,
+        starts: NDArray[np.int64],
+        window_length: int,
+        sample_indices: NDArray[np.int64],
+        file_index: int,
+        detector: str,
+        gps_start: float,
+        **injection_fields: NDArray
+    ) -> "WindowBatch":
+        starts = np.asarray(starts, dtype=np.int64)
+        n_windows = len(starts)
+        if n_windows:
+            strains = sliding_window_view(strain, window_length)[starts]
+        else:
+            strains = np.empty((0, window_length), dtype=np.float64)
+
+        return cls(
+            t0s=np.asarray(times)[starts],
+            strains=strains,
+            sample_indices=np.asarray(sample_indices, dtype=np.int32),
+            file_indices=np.full(n_windows, file_index, dtype=np.int32),
+            detector_codes=np.zeros(n_windows, dtype=np.int8),
+            gps_starts=np.full(n_windows, gps_start, dtype=np.float64),
+            detector_names=(detector,),
+            delta_t=delta_t,
+            **injection_fields
+        )
+
+    @classmethod
+    def empty(cls) -> "WindowBatch":
+        return cls(
+            t0s=np.empty(0),
+            strains=np.empty((0, 0)),
+            sample_indices=np.empty(0, dtype=np.int32),
+            file_indices=np.empty(0, dtype=np.int32),
+            detector_codes=np.empty(0, dtype=np.int8),
+            gps_starts=np.empty(0)
+        )
+
+    @classmethod
+    def from_samples(cls, samples: List[Dict[str, Any]]) -> "WindowBatch":
+        if isinstance(samples, WindowBatch):
+            return samples
+        if not samples:
+            return cls.empty()
+
+        detector_names = tuple(dict.fromkeys(s['detector'] for s in samples))
+        codes = {name: code for code, name in enumerate(detector_names)}
+        first_sample = samples[0]
+
+        injection_fields = dict()
+        if 'snr' in first_sample:
+            injection_fields = {
+                'distances': np.array([s['distance'] for s in samples], dtype=np.float64),
+                'snrs': np.array([s['snr'] for s in samples], dtype=np.float64),
+                'injection_times': np.array([s['injection_time'] for s in samples], dtype=np.float64)
+            }
+        if first_sample.get('model') is not None:
+            injection_fields['models'] = np.array([s['model'] for s in samples], dtype='S')
+
+        first_time = first_sample['time']
+        return cls(
+            t0s=np.array([s['time'][0] for s in samples], dtype=np.float64),
+            strains=np.stack([s['strain'] for s in samples]),
+            sample_indices=np.array([s['sample_index'] for s in samples], dtype=np.int32),
+            file_indices=np.array([s['file_index'] for s in samples], dtype=np.int32),
+            detector_codes=np.array([codes[s['detector']] for s in samples], dtype=np.int8),
+            gps_starts=np.array([s['gps_start'] for s in samples], dtype=np.float64),
+            detector_names=detector_names,
+            delta_t=float(first_time[1] - first_time[0]) if len(first_time) > 1 else None,
+            **injection_fields
+        )
+
+    @classmethod
+    def concatenate(cls, batches: Sequence["WindowBatch"]) -> "WindowBatch":
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+
+        if len(set(batch.delta_t for batch in batches)) > 1:
+            raise ValueError("Cannot concatenate window batches with different sample rates")
+
+        detector_names = tuple(dict.fromkeys(name for batch in batches for name in batch.detector_names))
+        codes = {name: code for code, name in enumerate(detector_names)}
+
+        columns = dict()
+        for name in cls.ROW_FIELDS:
+            values = [getattr(batch, name) for batch in batches]
+            if all(value is None for value in values):
+                continue
+            if name == "detector_codes":
+                values = [
+                    np.array([codes[detector] for detector in batch.detector_names], dtype=np.int8)[value]
+                    for batch, value in zip(batches, values)
+                ]
+            elif name == "models":
+                values = [np.full(len(batch), b"", dtype='S1') if value is None else value for batch, value in zip(batches, values)]
+            elif name in cls.INJECTION_FIELDS:
+                values = [np.full(len(batch), np.nan) if value is None else value for batch, value in zip(batches, values)]
+            columns[name] = np.concatenate(values)
+
+        return cls(detector_names=detector_names, delta_t=batches[0].delta_t, **columns)
+
+    def to_samples(self) -> List[Dict[str, Any]]:
+        detectors = [self.detector_names[code] for code in self.detector_codes]
+        times = self.times
+        samples = []
+        for i in range(len(self)):
+            sample = {
+                'time': times[i],
+                'strain': self.strains[i],
+                'sample_index': int(self.sample_indices[i]),
+                'file_index': int(self.file_indices[i]),
+                'detector': detectors[i],
+                'gps_start': float(self.gps_starts[i])
+            }
+            if self.has_injections:
+                sample.update({
+                    'distance': float(self.distances[i]),
+                    'snr': float(self.snrs[i]),
+                    'injection_time': float(self.injection_times[i]),
+                    'model': self.models[i].decode() if self.models is not None else None
+                })
+            samples.append(sample)
+        return samples
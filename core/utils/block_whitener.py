@@ -0,0 +1,194 @@
+import numpy as np
+from pycbc.types.timeseries import TimeSeries
+from pycbc.types.frequencyseries import FrequencySeries
+from pycbc.psd import interpolate, inverse_spectrum_truncation
+from typing import Callable, Hashable, Iterable, Iterator, List, Tuple
+from numpy.typing import NDArray
+
+from core.types.custom_types import GWOSCFileData
+from core.utils.logger import Logger
+from core.utils.preprocessing import bandpass_response
+
+
+class BlockWhitener:
+    def __init__(
+        self,
+        delta_t: float,
+        filter_duration: float = 10.0,
+        lowcut: float = None,
+        highcut: float = None,
+        psd: FrequencySeries = None,
+        scaling_factor: float = None,
+        psd_segment_duration: float = 0.5,
+        psd_decay: float = 0.9,
+        block_duration: float = 64.0,
+        order: int = 8
+    ):
+        self.delta_t = delta_t
+        self.lowcut = lowcut
+        self.highcut = highcut
+        self.order = order
+        self.psd_segment_duration = psd_segment_duration
+        self.psd_decay = psd_decay
+        self.running_psd = psd is None
+
+        self.filter_length = int(round(filter_duration / delta_t)) // 2 * 2 + 1
+        self.latency = (self.filter_length - 1) // 2
+        self.block_length = max(int(round(block_duration / delta_t)), self.filter_length)
+        self.fft_length = self.block_length + self.filter_length - 1
+
+        self.psd = psd
+        self.scaling_factor = scaling_factor
+        self._kernel_fft = None
+        if psd is not None:
+            if scaling_factor is None:
+                self.scaling_factor = float(min(psd**0.5))
+            self._build_kernel(psd)
+        self.reset()
+
+    def reset(self) -> None:
+        self._buffer = np.zeros(0)
+        self.samples_in = 0
+        self.samples_out = 0
+
+    def feed(self, samples: NDArray[np.float64]) -> NDArray[np.float64]:
+        self._buffer = np.concatenate([self._buffer, np.asarray(samples, dtype=np.float64)])
+        self.samples_in += len(samples)
+
+        outputs = []
+        while len(self._buffer) >= self.fft_length:
+            outputs.append(self._process(self._buffer[:self.fft_length]))
+            self._buffer = self._buffer[self.block_length:]
+        return self._collect(outputs)
+
+    def flush(self) -> NDArray[np.float64]:
+        remaining = len(self._buffer)
+        if remaining < self.filter_length:
+            self._buffer = np.zeros(0)
+            return np.zeros(0)
+
+        segment = np.zeros(self.fft_length)
+        segment[:remaining] = self._buffer
+        self._buffer = np.zeros(0)
+        return self._collect([self._process(segment, valid=remaining)])
+
+    def process(self, chunks: Iterable[NDArray[np.float64]]) -> Iterator[NDArray[np.float64]]:
+        for chunk in chunks:
+            output = self.feed(chunk)
+            if len(output):
+                yield output
+        output = self.flush()
+        if len(output):
+            yield output
+
+    def _process(self, segment: NDArray[np.float64], valid: int = None) -> NDArray[np.float64]:
+        valid = self.fft_length if valid is None else valid
+        if self.running_psd:
+            self._update_psd(segment[self.filter_length - 1:valid])
+
+        output = np.fft.irfft(np.fft.rfft(segment) * self._kernel_fft, n=self.fft_length)
+        return output[self.filter_length - 1:valid] * self.scaling_factor
+
+    def _collect(self, outputs: List[NDArray[np.float64]]) -> NDArray[np.float64]:
+        output = np.concatenate(outputs) if outputs else np.zeros(0)
+        self.samples_out += len(output)
+        return output
+
+    def _update_psd(self, samples: NDArray[np.float64]) -> None:
+        if len(samples) * self.delta_t < 2 * self.psd_segment_duration:
+            if self._kernel_fft is None:
+                raise ValueError("Not enough samples to estimate the first whitening PSD")
+            return
+
+        block_psd = TimeSeries(samples, self.delta_t).psd(self.psd_segment_duration)
+        if self.psd is None:
+            self.psd = block_psd
+            if self.scaling_factor is None:
+                self.scaling_factor = float(min(block_psd**0.5))
+        else:
+            self.psd = self.psd * self.psd_decay + block_psd * (1.0 - self.psd_decay)
+        self._build_kernel(self.psd)
+
+    def _build_kernel(self, psd: FrequencySeries) -> None:
+        psd = inverse_spectrum_truncation(
+            interpolate(psd, 1.0 / (self.fft_length * self.delta_t)),
+            max_filter_len=self.filter_length - 1,
+            trunc_method='hann'
+        )
+        response = 1.0 / psd.numpy()**0.5
+        if self.lowcut is not None and self.highcut is not None:
+            response = response * bandpass_response(
+                self.fft_length,
+                self.delta_t,
+                self.lowcut,
+                self.highcut,
+                order=self.order
+            )
+
+        impulse = np.fft.irfft(response, n=self.fft_length)
+        kernel = np.zeros(self.fft_length)
+        kernel[:self.latency] = impulse[-self.latency:]
+        kernel[self.latency:self.filter_length] = impulse[:self.latency + 1]
+        self._kernel_fft = np.fft.rfft(kernel)
+
+
+def whiten_contiguous(
+    files: Iterable[Tuple[Hashable, GWOSCFileData]],
+    whitener_factory: Callable[[float], BlockWhitener]
+) -> Iterator[Tuple[Hashable, GWOSCFileData, TimeSeries]]:
+    whitener = None
+    pending = []
+    output = np.zeros(0)
+    output_start = 0
+    next_start = None
+
+    def emit(final: bool) -> Iterator[Tuple[Hashable, GWOSCFileData, TimeSeries]]:
+        nonlocal output, output_start
+        output_stop = output_start + len(output)
+        while pending and (final or pending[0][3] <= output_stop):
+            key, file_data, file_start, file_stop = pending.pop(0)
+            start = max(file_start, output_start)
+            stop = min(file_stop, output_stop)
+            delta_t = file_data["time_sampling"]
+            epoch = (file_data.get("offset", 0) + start - file_start) * delta_t
+            yield key, file_data, TimeSeries(output[start - output_start:max(start, stop) - output_start], delta_t, epoch=epoch)
+
+        keep_from = pending[0][2] if pending else output_stop
+        if keep_from > output_start:
+            output = output[keep_from - output_start:]
+            output_start = keep_from
+
+    for key, file_data in files:
+        delta_t = file_data["time_sampling"]
+        strain = file_data["strain"]
+        contiguous = (
+            whitener is not None
+            and whitener.delta_t == delta_t
+            and file_data.get("offset", 0) == 0
+            and next_start is not None
+            and abs(next_start - file_data["gps_start"]) < delta_t / 2
+        )
+
+        if not contiguous:
+            if whitener is not None:
+                output = np.concatenate([output, whitener.flush()])
+                yield from emit(final=True)
+                Logger.info(f"Starting a new continuous segment at GPS {file_data['gps_start']}", verbose=False)
+            whitener = whitener_factory(delta_t)
+            output = np.zeros(0)
+            output_start = whitener.latency
+            stream_position = 0
+
+        pending.append((key, file_data, stream_position, stream_position + len(strain)))
+        stream_position += len(strain)
+        full_file = file_data.get("offset", 0) == 0 and len(strain) == int(round(file_data["duration"] / delta_t))
+        next_start = file_data["gps_start"] + file_data["duration"] if full_file else None
+
+        for block_start in range(0, len(strain), whitener.block_length):
+            block = np.asarray(strain[block_start:block_start + whitener.block_length])
+            output = np.concatenate([output, whitener.feed(block)])
+            yield from emit(final=False)
+
+    if whitener is not None:
+        output = np.concatenate([output, whitener.flush()])
+        yield from emit(final=True)
@@ -0,0 +1,109 @@
+import os
+import time
+import tempfile
+import h5py
+import numpy as np
+from jsonargparse import auto_cli
+from typing import Dict, List
+
+from core.handlers.h5_window_writer import H5WindowWriter
+from core.utils.h5_filters import parse_codec
+from core.utils.logger import Logger
+
+DEFAULT_CODECS = ["none", "gzip:1", "gzip:4", "gzip:4+shuffle", "lzf", "lzf+shuffle", "zstd:3+shuffle", "blosc:lz4:5+shuffle"]
+
+
+def read_sample(path: str, n_samples: int = 512) -> Dict[str, np.ndarray]:
+    with h5py.File(path, 'r') as f:
+        n_rows = min(n_samples, len(f['strains']))
+        return {
+            name: dataset[:n_rows]
+            for name, dataset in f.items()
+            if isinstance(dataset, h5py.Dataset) and dataset.shape and len(dataset) == len(f['strains'])
+        }
+
+
+def benchmark_codec(
+    columns: Dict[str, np.ndarray],
+    codec: str,
+    directory: str,
+    chunk_bytes: int = 1 << 20,
+    n_random_reads: int = 256,
+    seed: int = 0
+) -> Dict[str, float]:
+    output_file = os.path.join(directory, f"{codec.replace(':', '_').replace('+', '_')}.h5")
+    raw_bytes = sum(values.nbytes for values in columns.values())
+    strain_row_bytes = columns['strains'][0].nbytes
+
+    started = time.perf_counter()
+    with H5WindowWriter(output_file, chunk_bytes=chunk_bytes, **parse_codec(codec)) as writer:
+        writer.append_columns(columns)
+    write_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with h5py.File(output_file, 'r') as f:
+        for name in columns:
+            f[name][:]
+    sequential_seconds = time.perf_counter() - started
+
+    indices = np.random.default_rng(seed).integers(0, len(columns['strains']), n_random_reads)
+    started = time.perf_counter()
+    with h5py.File(output_file, 'r', rdcc_nbytes=0) as f:
+        strains = f['strains']
+        for index in indices:
+            strains[index]
+    random_seconds = time.perf_counter() - started
+
+    file_bytes = os.path.getsize(output_file)
+    os.remove(output_file)
+    return {
+        "write_mb_s": raw_bytes / write_seconds / 1e6,
+        "sequential_read_mb_s": raw_bytes / sequential_seconds / 1e6,
+        "random_read_mb_s": n_random_reads * strain_row_bytes / random_seconds / 1e6,
+        "compression_ratio": raw_bytes / file_bytes
+    }
+
+
+def compression_report(
+    path: str,
+    codecs: List[str] = DEFAULT_CODECS,
+    n_samples: int = 512,
+    chunk_bytes: int = 1 << 20,
+    n_random_reads: int = 256,
+    seed: int = 0,
+    work_dir: str = None
+) -> Dict[str, Dict[str, float]]:
+    columns = read_sample(path, n_samples)
+    report = dict()
+    with tempfile.TemporaryDirectory(dir=work_dir) as directory:
+        for codec in codecs:
+            try:
+                report[codec] = benchmark_codec(columns, codec, directory, chunk_bytes, n_random_reads, seed)
+            except ImportError as error:
+                Logger.warning(f"Skipping {codec}: {error}")
+    return report
+
+
+def main(
+    path: str,
+    codecs: List[str] = DEFAULT_CODECS,
+    n_samples: int = 512,
+    chunk_bytes: int = 1 << 20,
+    n_random_reads: int = 256,
+    seed: int = 0,
+    work_dir: str = None
+):
+    report = compression_report(path, codecs, n_samples, chunk_bytes, n_random_reads, seed, work_dir)
+
+    Logger.info(f"Compression benchmark on the first {n_samples} samples of {path} ({chunk_bytes} byte chunks)")
+    for codec, metrics in report.items():
+        Logger.info(
+            f"{codec}: write {metrics['write_mb_s']:.1f} MB/s, "
+            f"sequential read {metrics['sequential_read_mb_s']:.1f} MB/s, "
+            f"random read {metrics['random_read_mb_s']:.1f} MB/s, "
+            f"ratio {metrics['compression_ratio']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    auto_cli(main)
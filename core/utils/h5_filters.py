@@ -0,0 +1,59 @@
+from typing import Any, Dict
+
+COMPRESSIONS = ("gzip", "lzf", "zstd", "blosc", "none")
+BLOSC_COMPRESSORS = ("lz4", "lz4hc", "zstd", "zlib", "blosclz")
+DATASET_OPTIONS = ("compression", "compression_opts", "shuffle", "chunk_rows", "chunk_bytes")
+
+
+def dataset_filters(compression: str = "gzip", compression_opts: int = None, shuffle: bool = False) -> Dict[str, Any]:
+    name, _, variant = (compression or "none").partition(":")
+    if name not in COMPRESSIONS:
+        raise ValueError(f"compression must be one of {COMPRESSIONS}, got {compression}")
+
+    if name == "none":
+        return {"shuffle": shuffle}
+    if name == "gzip":
+        return {"compression": "gzip", "compression_opts": 4 if compression_opts is None else compression_opts, "shuffle": shuffle}
+    if name == "lzf":
+        return {"compression": "lzf", "shuffle": shuffle}
+
+    cname = variant or "lz4"
+    if name == "blosc" and cname not in BLOSC_COMPRESSORS:
+        raise ValueError(f"blosc compressor must be one of {BLOSC_COMPRESSORS}, got {cname}")
+
+    hdf5plugin = _import_hdf5plugin(compression)
+    if name == "zstd":
+        return {**hdf5plugin.Zstd(clevel=3 if compression_opts is None else compression_opts), "shuffle": shuffle}
+    return dict(hdf5plugin.Blosc(
+        cname=cname,
+        clevel=5 if compression_opts is None else compression_opts,
+        shuffle=hdf5plugin.Blosc.SHUFFLE if shuffle else hdf5plugin.Blosc.NOSHUFFLE
+    ))
+
+
+def parse_codec(spec: str) -> Dict[str, Any]:
+    spec, shuffle, _ = spec.partition("+shuffle")
+    name, _, level = spec.rpartition(":")
+    if not name or not level.isdigit():
+        name, level = spec, None
+    return {
+        "compression": name,
+        "compression_opts": None if level is None else int(level),
+        "shuffle": bool(shuffle)
+    }
+
+
+def validate_dataset_options(dataset_options: Dict[str, Dict[str, Any]]) -> None:
+    for name, options in (dataset_options or {}).items():
+        unknown = set(options) - set(DATASET_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown options {sorted(unknown)} for dataset {name}, expected {DATASET_OPTIONS}")
+        dataset_filters(options.get("compression", "gzip"), options.get("compression_opts"), options.get("shuffle", False))
+
+
+def _import_hdf5plugin(compression: str) -> Any:
+    try:
+        import hdf5plugin
+    except ImportError as error:
+        raise ImportError(f"compression {compression} requires the hdf5plugin package (pip install hdf5plugin)") from error
+    return hdf5plugin
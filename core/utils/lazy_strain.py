@@ -0,0 +1,85 @@
+import math
+import h5py
+import numpy as np
+from typing import Optional, Tuple
+from numpy.typing import NDArray
+
+from core.types.custom_types import StrainSpan
+
+
+def span_to_indices(span: Optional[StrainSpan], length: int, delta_t: float) -> Tuple[int, int]:
+    if span is None:
+        return 0, length
+    padding = int(math.ceil(span["padding_seconds"] / delta_t))
+    start = max(0, int(math.floor(span["start_fraction"] * length)) - padding)
+    stop = min(length, int(math.ceil(span["end_fraction"] * length)) + padding)
+    return start, stop
+
+
+class LazyStrain:
+    def __init__(
+        self,
+        path: str,
+        dataset: str = "strain/Strain",
+        start: int = 0,
+        stop: Optional[int] = None
+    ):
+        self.path = path
+        self.dataset = dataset
+
+        with h5py.File(path, "r") as f:
+            strain_dataset = f[dataset]
+            self.file_length = strain_dataset.shape[0]
+            self.dtype = strain_dataset.dtype
+            contiguous = strain_dataset.chunks is None and strain_dataset.compression is None
+            self._memmap_offset = strain_dataset.id.get_offset() if contiguous else None
+
+        self.start = start
+        self.stop = self.file_length if stop is None else min(stop, self.file_length)
+
+    @property
+    def shape(self) -> Tuple[int]:
+        return (len(self),)
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __getitem__(self, key) -> NDArray[np.float64]:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            return self.read(start, stop)[::step]
+        if isinstance(key, (int, np.integer)):
+            index = key + len(self) if key < 0 else key
+            return self.read(index, index + 1)[0]
+        return self.materialize()[key]
+
+    def __array__(self, dtype=None, copy=None) -> NDArray[np.float64]:
+        strain = self.materialize()
+        return strain if dtype is None else strain.astype(dtype, copy=False)
+
+    def subspan(self, start: int, stop: int) -> "LazyStrain":
+        span = LazyStrain.__new__(LazyStrain)
+        span.__dict__.update(self.__dict__)
+        span.start = self.start + max(0, start)
+        span.stop = min(self.stop, self.start + stop)
+        return span
+
+    def read(self, start: int, stop: int) -> NDArray[np.float64]:
+        start = self.start + max(0, start)
+        stop = min(self.stop, self.start + stop)
+
+        if self._memmap_offset is not None:
+            mapped = np.memmap(
+                self.path,
+                dtype=self.dtype,
+                mode="r",
+                offset=self._memmap_offset,
+                shape=(self.file_length,)
+            )
+            return np.array(mapped[start:stop])
+
+        with h5py.File(self.path, "r") as f:
+            return f[self.dataset][start:stop]
+
+    def materialize(self) -> NDArray[np.float64]:
+        return self.read(0, len(self))
@@ -0,0 +1,155 @@
+import math
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from core.handlers.psd_cache import PSDCache
+from core.types.custom_types import GWOSCFileData
+from core.utils.logger import Logger
+from core.utils.streaming import batch_length, concatenate_batches, truncate_batch
+
+FileTask = Tuple[int, GWOSCFileData, Tuple[Any, ...]]
+
+
+class SharedArrayRef:
+    def __init__(self, name: str, shape: Tuple[int, ...], dtype: str):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+
+def run_file_tasks(
+    function: Callable[..., List[Any]],
+    groups: Dict[Hashable, List[FileTask]],
+    n_samples: int,
+    estimate_per_file: Callable[[GWOSCFileData], int],
+    n_workers: int,
+    psd_cache: PSDCache = None
+) -> Dict[Hashable, List[Any]]:
+    if n_workers <= 1:
+        return _run_serial(function, groups, n_samples)
+
+    pending = {key: list(tasks) for key, tasks in groups.items()}
+    results = {key: [] for key in groups}
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        while True:
+            wave = _plan_wave(pending, results, n_samples, estimate_per_file, n_workers)
+            if not wave:
+                break
+
+            Logger.info(f"Processing {len(wave)} files on {n_workers} workers", verbose=False)
+            wave_results = _map_shared(executor, function, [task for _, task in wave], psd_cache)
+            for (key, _), samples in zip(wave, wave_results):
+                results[key].append(samples)
+
+    return {key: truncate_batch(concatenate_batches(chunks), n_samples) for key, chunks in results.items()}
+
+
+def _run_serial(
+    function: Callable[..., List[Any]],
+    groups: Dict[Hashable, List[FileTask]],
+    n_samples: int
+) -> Dict[Hashable, List[Any]]:
+    results = dict()
+    for key, tasks in groups.items():
+        chunks = []
+        for file_index, file_data, extra in tasks:
+            if _count(chunks) >= n_samples:
+                break
+            chunks.append(function(file_data, file_index, *extra))
+        results[key] = truncate_batch(concatenate_batches(chunks), n_samples)
+    return results
+
+
+def _plan_wave(
+    pending: Dict[Hashable, List[FileTask]],
+    results: Dict[Hashable, List[Any]],
+    n_samples: int,
+    estimate_per_file: Callable[[GWOSCFileData], int],
+    n_workers: int
+) -> List[Tuple[Hashable, FileTask]]:
+    wave = []
+    for key, tasks in pending.items():
+        missing = n_samples - _count(results[key])
+        if missing <= 0 or not tasks:
+            continue
+        per_file = max(1, estimate_per_file(tasks[0][1]))
+        n_files = min(len(tasks), math.ceil(missing / per_file), n_workers - len(wave))
+        wave.extend((key, task) for task in tasks[:n_files])
+        del tasks[:n_files]
+        if len(wave) >= n_workers:
+            break
+    return wave
+
+
+def _count(chunks: List[Any]) -> int:
+    return sum(batch_length(chunk) for chunk in chunks)
+
+
+def _map_shared(
+    executor: Executor,
+    function: Callable[..., List[Any]],
+    tasks: List[FileTask],
+    psd_cache: PSDCache = None
+) -> List[List[Any]]:
+    segments = []
+    try:
+        shared_tasks = []
+        for file_index, file_data, extra in tasks:
+            shared_data = dict(file_data)
+            if isinstance(file_data["strain"], np.ndarray):
+                segment, shared_data["strain"] = _share(file_data["strain"])
+                segments.append(segment)
+            shared_tasks.append((function, file_index, shared_data, extra, psd_cache))
+
+        results = []
+        for samples, counters in executor.map(_run_task, shared_tasks):
+            if psd_cache is not None:
+                psd_cache.add_counters(counters)
+            results.append(samples)
+        return results
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+
+def _share(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, SharedArrayRef]:
+    segment = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+    shared[...] = array
+    return segment, SharedArrayRef(segment.name, array.shape, array.dtype.str)
+
+
+def _run_task(
+    task: Tuple[Callable[..., List[Any]], int, GWOSCFileData, Tuple[Any, ...], PSDCache]
+) -> Tuple[List[Any], Dict[str, int]]:
+    function, file_index, file_data, extra, psd_cache = task
+    if psd_cache is None:
+        return _call(function, file_index, file_data, extra), {}
+
+    before = psd_cache.counters()
+    samples = _call(function, file_index, file_data, extra)
+    return samples, {name: count - before[name] for name, count in psd_cache.counters().items()}
+
+
+def _call(
+    function: Callable[..., List[Any]],
+    file_index: int,
+    file_data: GWOSCFileData,
+    extra: Tuple[Any, ...]
+) -> List[Any]:
+    strain_ref = file_data["strain"]
+    if not isinstance(strain_ref, SharedArrayRef):
+        return function(file_data, file_index, *extra)
+
+    segment = shared_memory.SharedMemory(name=strain_ref.name)
+    try:
+        file_data = dict(file_data)
+        file_data["strain"] = np.ndarray(strain_ref.shape, dtype=strain_ref.dtype, buffer=segment.buf)
+        return function(file_data, file_index, *extra)
+    finally:
+        del file_data
+        segment.close()
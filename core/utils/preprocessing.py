@@ -1,47 +1,345 @@
 import numpy as np
+from functools import cached_property
+from scipy.signal import firwin
+from scipy.signal.windows import tukey
 from pycbc.types.timeseries import TimeSeries
-from pycbc.psd import welch as psd_welch
+from pycbc.types.frequencyseries import FrequencySeries
+from pycbc.psd import welch as psd_welch, interpolate, inverse_spectrum_truncation
 from pycbc.filter import highpass, lowpass_fir
 from typing import List, Tuple
 
+from core.handlers.psd_cache import PSDCache
 from core.utils.logger import Logger
 
-def whitening(
-        strain:List[float],
+DIAGNOSTIC_SEGMENT_SECONDS: float = 4.0
+DIAGNOSTIC_STRIDE_SECONDS: float = 2.0
+PREPROCESSING_ENGINES = ("pycbc", "fused", "block")
+TAPERS = ("tukey", "hann", "none")
+NORMALIZATIONS = ("diagnostic", "whitening")
+
+
+class WhiteningResult:
+    def __init__(
+        self,
+        strain: TimeSeries,
+        psd: FrequencySeries,
+        scaling_factor: float,
+        raw_strain: TimeSeries
+    ):
+        self.strain = strain
+        self.psd = psd
+        self.scaling_factor = scaling_factor
+        self._raw_strain = raw_strain
+
+    @cached_property
+    def raw_psd(self) -> FrequencySeries:
+        return diagnostic_psd(self._raw_strain)
+
+    @cached_property
+    def whitened_psd(self) -> FrequencySeries:
+        return diagnostic_psd(self.strain)
+
+    @property
+    def frequencies(self) -> np.ndarray:
+        return self.raw_psd.sample_frequencies
+
+
+def whiten(
+        strain: List[float],
         lowpass_cutoff: int,
         whitening_window: float,
-        delta_t: float
-    )-> Tuple[TimeSeries, TimeSeries, TimeSeries, np.ndarray]:
-    Logger.info("Converting strain data to TimeSeries for whitening.", verbose=False)
-    strain_timeseries = TimeSeries(strain, delta_t)
-    whitened_strain = strain_timeseries.whiten(whitening_window, lowpass_cutoff)
+        delta_t: float,
+        epoch: float = 0.0,
+        psd: FrequencySeries = None,
+        scaling_factor: float = None,
+        psd_cache: PSDCache = None,
+        detector: str = None,
+        gps_start: float = None,
+        source_id: str = None,
+        normalization: str = "diagnostic"
+    ) -> WhiteningResult:
+    strain_timeseries = TimeSeries(strain, delta_t, epoch=epoch)
+    max_filter_len = int(round(lowpass_cutoff * strain_timeseries.sample_rate))
 
-    segment_length = int(4/delta_t)
-    segment_stride = int(2/delta_t)
-    Logger.info("Calculating PSD.", verbose=False)
-    psd = psd_welch(strain_timeseries, seg_len=segment_length, seg_stride=segment_stride)
-    asd = psd**0.5
-    scaling_factor = min(asd)
-    whitened_scaled = whitened_strain * scaling_factor
+    if psd is None:
+        psd, scaling_factor = _estimate_whitening_psd(
+            strain_timeseries, whitening_window, max_filter_len,
+            psd_cache=psd_cache, detector=detector, gps_start=gps_start, source_id=source_id,
+            normalization=normalization
+        )
 
-    psd_whitened_scaled = psd_welch(whitened_scaled, seg_len=segment_length, seg_stride=segment_stride)
-    frequencies = psd.sample_frequencies
+    white = (strain_timeseries.to_frequencyseries() / psd**0.5).to_timeseries()
+    white = white[int(max_filter_len/2):int(len(strain_timeseries)-max_filter_len/2)]
+    if scaling_factor is not None:
+        white *= scaling_factor
 
-    return (whitened_scaled, psd_whitened_scaled, psd, frequencies)
+    return WhiteningResult(white, psd, scaling_factor, strain_timeseries)
 
-def bandpass(
+def whiten_bandpass(
+        strain: List[float],
+        lowpass_cutoff: int,
+        whitening_window: float,
+        delta_t: float,
+        lowcut: float,
+        highcut: float,
+        epoch: float = 0.0,
+        psd: FrequencySeries = None,
+        scaling_factor: float = None,
+        taper: str = "tukey",
+        order: int = 8,
+        psd_cache: PSDCache = None,
+        detector: str = None,
+        gps_start: float = None,
+        source_id: str = None,
+        normalization: str = "diagnostic"
+    ) -> WhiteningResult:
+    strain_timeseries = TimeSeries(strain, delta_t, epoch=epoch)
+    n_points = len(strain_timeseries)
+    max_filter_len = int(round(lowpass_cutoff * strain_timeseries.sample_rate))
+
+    if psd is None:
+        psd, scaling_factor = _estimate_whitening_psd(
+            strain_timeseries, whitening_window, max_filter_len,
+            psd_cache=psd_cache, detector=detector, gps_start=gps_start, source_id=source_id,
+            normalization=normalization
+        )
+
+    crop_start = int(max_filter_len/2)
+    crop_stop = int(n_points - max_filter_len/2)
+    window = taper_window(n_points, crop_start, taper)
+    samples = strain_timeseries.numpy() if window is None else strain_timeseries.numpy() * window
+
+    spectrum = np.fft.rfft(samples)
+    spectrum *= bandpass_response(n_points, delta_t, lowcut, highcut, order=order) / psd.numpy()**0.5
+    white = np.fft.irfft(spectrum, n=n_points)[crop_start:crop_stop]
+    if scaling_factor is not None:
+        white *= scaling_factor
+
+    white = TimeSeries(white, delta_t, epoch=strain_timeseries.start_time + crop_start * delta_t)
+    return WhiteningResult(white, psd, scaling_factor, strain_timeseries)
+
+def whiten_blocks(
+        strain: List[float],
+        lowpass_cutoff: int,
+        whitening_window: float,
+        delta_t: float,
+        lowcut: float,
+        highcut: float,
+        epoch: float = 0.0,
+        psd: FrequencySeries = None,
+        scaling_factor: float = None,
+        order: int = 8,
+        block_duration: float = 64.0,
+        psd_cache: PSDCache = None,
+        detector: str = None,
+        gps_start: float = None,
+        source_id: str = None,
+        normalization: str = "diagnostic"
+    ) -> WhiteningResult:
+    from core.utils.block_whitener import BlockWhitener
+
+    strain_timeseries = TimeSeries(strain, delta_t, epoch=epoch)
+    max_filter_len = int(round(lowpass_cutoff * strain_timeseries.sample_rate))
+
+    if psd is None:
+        psd, scaling_factor = _estimate_whitening_psd(
+            strain_timeseries, whitening_window, max_filter_len,
+            psd_cache=psd_cache, detector=detector, gps_start=gps_start, source_id=source_id,
+            normalization=normalization
+        )
+
+    whitener = BlockWhitener(
+        delta_t,
+        filter_duration=lowpass_cutoff,
+        lowcut=lowcut,
+        highcut=highcut,
+        psd=psd,
+        scaling_factor=scaling_factor,
+        block_duration=block_duration,
+        order=order
+    )
+    samples = strain_timeseries.numpy()
+    blocks = (samples[start:start + whitener.block_length] for start in range(0, len(samples), whitener.block_length))
+    white = np.concatenate(list(whitener.process(blocks)))
+
+    white = TimeSeries(white, delta_t, epoch=strain_timeseries.start_time + whitener.latency * delta_t)
+    return WhiteningResult(white, psd, whitener.scaling_factor, strain_timeseries)
+
+def preprocess(
+        strain: List[float],
+        lowpass_cutoff: int,
+        whitening_window: float,
+        delta_t: float,
+        lowcut: float,
+        highcut: float,
+        epoch: float = 0.0,
+        psd: FrequencySeries = None,
+        scaling_factor: float = None,
+        engine: str = "pycbc",
+        taper: str = "tukey",
+        order: int = 8,
+        block_duration: float = 64.0,
+        psd_cache: PSDCache = None,
+        detector: str = None,
+        gps_start: float = None,
+        source_id: str = None,
+        normalization: str = "diagnostic"
+    ) -> WhiteningResult:
+    cache_arguments = dict(
+        psd_cache=psd_cache, detector=detector, gps_start=gps_start, source_id=source_id, normalization=normalization
+    )
+    if engine == "block":
+        return whiten_blocks(
+            strain, lowpass_cutoff, whitening_window, delta_t, lowcut, highcut,
+            epoch=epoch, psd=psd, scaling_factor=scaling_factor, order=order, block_duration=block_duration,
+            **cache_arguments
+        )
+    if engine == "fused":
+        return whiten_bandpass(
+            strain, lowpass_cutoff, whitening_window, delta_t, lowcut, highcut,
+            epoch=epoch, psd=psd, scaling_factor=scaling_factor, taper=taper, order=order,
+            **cache_arguments
+        )
+    if engine != "pycbc":
+        raise ValueError(f"engine must be one of {PREPROCESSING_ENGINES}, got {engine}")
+
+    result = whiten(
+        strain, lowpass_cutoff, whitening_window, delta_t,
+        epoch=epoch, psd=psd, scaling_factor=scaling_factor,
+        **cache_arguments
+    )
+    result.strain = bandpass_filter(result.strain, lowcut, highcut, order=order)
+    return result
+
+def bandpass_response(
+    n_points: int,
+    delta_t: float,
+    lowcut: float,
+    highcut: float,
+    order: int = 8,
+    attenuation: float = 0.1,
+    beta: float = 5.0
+    ) -> np.ndarray:
+    frequencies = np.fft.rfftfreq(n_points, delta_t)
+
+    with np.errstate(divide='ignore', over='ignore'):
+        ratio = (lowcut / frequencies)**(2 * order)
+    highpass_response = 1.0 / (1.0 + (1.0 / np.sqrt(1.0 - attenuation) - 1.0) * ratio)
+
+    coefficients = firwin(2 * order + 1, highcut / (int(1.0 / delta_t) / 2), window=('kaiser', beta))
+    kernel = np.zeros(n_points)
+    kernel[:len(coefficients)] = coefficients
+    shift = (len(coefficients) + 1) // 2
+    lowpass_response = np.fft.rfft(kernel) * np.exp(2j * np.pi * frequencies * shift * delta_t)
+
+    return highpass_response * lowpass_response
+
+def taper_window(n_points: int, taper_length: int, taper: str = "tukey") -> np.ndarray:
+    if taper == "none":
+        return None
+    if taper == "hann":
+        taper_length = min(taper_length, n_points // 2)
+        ramp = np.hanning(2 * taper_length)
+        window = np.ones(n_points)
+        window[:taper_length] = ramp[:taper_length]
+        window[n_points - taper_length:] = ramp[taper_length:]
+        return window
+    if taper == "tukey":
+        return tukey(n_points, alpha=min(1.0, 2.0 * taper_length / n_points))
+    raise ValueError(f"taper must be one of {TAPERS}, got {taper}")
+
+def bandpass_filter(
     strain: TimeSeries,
     lowcut: int,
     highcut: int,
-    delta_t: list,
     order: int = 8
-    ) -> Tuple[List[float], List[float]]:
+    ) -> TimeSeries:
+    strain_filtered = highpass(strain, lowcut, filter_order=order)
+    return lowpass_fir(strain_filtered, highcut, order=order)
 
-    segment_length = int(4/delta_t)
-    segment_stride = int(2/delta_t)
+def _estimate_whitening_psd(
+    strain: TimeSeries,
+    whitening_window: float,
+    max_filter_len: int,
+    psd_cache: PSDCache = None,
+    detector: str = None,
+    gps_start: float = None,
+    source_id: str = None,
+    normalization: str = "diagnostic"
+    ) -> Tuple[FrequencySeries, float]:
+    if normalization not in NORMALIZATIONS:
+        raise ValueError(f"normalization must be one of {NORMALIZATIONS}, got {normalization}")
 
-    strain_filtered = highpass(strain, lowcut, filter_order=order)
-    strain_filtered = lowpass_fir(strain_filtered, highcut, order=order)
-    psd_filtered = psd_welch(strain_filtered, segment_length, segment_stride)
+    def estimate() -> FrequencySeries:
+        Logger.info("Calculating whitening PSD.", verbose=False)
+        return strain.psd(whitening_window)
+
+    def estimate_diagnostic() -> FrequencySeries:
+        Logger.info("Calculating PSD.", verbose=False)
+        return diagnostic_psd(strain)
+
+    def cached(variant: str, segment_length: int, segment_stride: int, compute) -> FrequencySeries:
+        if psd_cache is None or detector is None or gps_start is None or source_id is None:
+            return compute()
+        key = psd_cache.key_for(
+            detector,
+            gps_start,
+            float(strain.duration),
+            float(strain.sample_rate),
+            segment_length,
+            segment_stride,
+            variant=variant,
+            source_id=source_id
+        )
+        return psd_cache.get_or_compute(key, compute)
+
+    segment_length = int(round(whitening_window * strain.sample_rate))
+    raw_psd = cached("whitening", segment_length, int(segment_length / 2), estimate)
+    if normalization == "whitening":
+        scaling_psd = raw_psd
+    else:
+        scaling_psd = cached(
+            "diagnostic",
+            int(DIAGNOSTIC_SEGMENT_SECONDS / strain.delta_t),
+            int(DIAGNOSTIC_STRIDE_SECONDS / strain.delta_t),
+            estimate_diagnostic
+        )
+    scaling_factor = float(min(scaling_psd**0.5))
+    psd = inverse_spectrum_truncation(
+        interpolate(raw_psd, strain.delta_f),
+        max_filter_len=max_filter_len,
+        trunc_method='hann'
+    )
+    return psd, scaling_factor
 
-    return (strain_filtered, psd_filtered)
+def diagnostic_psd(strain: TimeSeries) -> FrequencySeries:
+    segment_length = int(DIAGNOSTIC_SEGMENT_SECONDS / strain.delta_t)
+    segment_stride = int(DIAGNOSTIC_STRIDE_SECONDS / strain.delta_t)
+    return psd_welch(strain, seg_len=segment_length, seg_stride=segment_stride)
+
+def whitening(
+        strain:List[float],
+        lowpass_cutoff: int,
+        whitening_window: float,
+        delta_t: float,
+        epoch: float = 0.0,
+        psd_cache: PSDCache = None,
+        detector: str = None,
+        gps_start: float = None,
+        source_id: str = None
+    )-> Tuple[TimeSeries, TimeSeries, TimeSeries, np.ndarray]:
+    result = whiten(
+        strain, lowpass_cutoff, whitening_window, delta_t, epoch=epoch,
+        psd_cache=psd_cache, detector=detector, gps_start=gps_start, source_id=source_id
+    )
+    return (result.strain, result.whitened_psd, result.raw_psd, result.frequencies)
+
+def bandpass(
+    strain: TimeSeries,
+    lowcut: int,
+    highcut: int,
+    delta_t: list,
+    order: int = 8
+    ) -> Tuple[List[float], List[float]]:
+    strain_filtered = bandpass_filter(strain, lowcut, highcut, order=order)
+    return (strain_filtered, diagnostic_psd(strain_filtered))
@@ -0,0 +1,92 @@
+import time
+import numpy as np
+from jsonargparse import auto_cli
+from typing import Dict, List
+
+from core.handlers.strain_reader import StrainReader
+from core.utils.logger import Logger
+from core.utils.preprocessing import TAPERS, diagnostic_psd, preprocess
+
+
+def equivalence_report(
+    strain: np.ndarray,
+    delta_t: float,
+    whitening_cut: int = 10,
+    whitening_window: float = 0.5,
+    bandpass_fmin: float = 100.0,
+    bandpass_fmax: float = 1600.0,
+    edge_seconds: float = 8.0,
+    tapers: List[str] = TAPERS
+) -> Dict[str, Dict[str, float]]:
+    arguments = (whitening_cut, whitening_window, delta_t, bandpass_fmin, bandpass_fmax)
+
+    started = time.perf_counter()
+    reference = preprocess(strain, *arguments, engine="pycbc").strain
+    reference_seconds = time.perf_counter() - started
+
+    edge = int(edge_seconds / delta_t)
+    reference_interior = reference.numpy()[edge:len(reference) - edge]
+    reference_psd = diagnostic_psd(reference)
+    band = (reference_psd.sample_frequencies >= bandpass_fmin) & (reference_psd.sample_frequencies <= bandpass_fmax)
+
+    report = dict()
+    for taper in tapers:
+        started = time.perf_counter()
+        fused = preprocess(strain, *arguments, engine="fused", taper=taper).strain
+        fused_seconds = time.perf_counter() - started
+
+        difference = fused.numpy()[edge:len(fused) - edge] - reference_interior
+        psd_ratio = diagnostic_psd(fused).numpy()[band] / reference_psd.numpy()[band]
+        report[taper] = {
+            "max_abs_error": float(np.max(np.abs(difference)) / np.max(np.abs(reference_interior))),
+            "rms_error": float(np.sqrt(np.mean(difference**2) / np.mean(reference_interior**2))),
+            "max_band_psd_deviation": float(np.max(np.abs(psd_ratio - 1.0))),
+            "pycbc_seconds": reference_seconds,
+            "fused_seconds": fused_seconds
+        }
+    return report
+
+
+def main(
+    path: str = None,
+    duration: float = 512.0,
+    sample_rate: int = 4096,
+    seed: int = 0,
+    whitening_cut: int = 10,
+    whitening_window: float = 0.5,
+    bandpass_fmin: float = 100.0,
+    bandpass_fmax: float = 1600.0,
+    edge_seconds: float = 8.0
+):
+    if path is not None:
+        file_data = StrainReader.read_hdf5(path, lazy=False)
+        strain, delta_t = np.asarray(file_data["strain"]), file_data["delta_t"]
+    else:
+        from core.strategies.loader.synthetic_noise_loader import SyntheticNoiseLoader
+
+        loader = SyntheticNoiseLoader(detectors=["H1"], n_files=1, sample_rate=sample_rate, duration=duration, seed=seed)
+        file_data = loader.load()["H1"][0]
+        strain, delta_t = file_data["strain"], file_data["delta_t"]
+
+    report = equivalence_report(
+        strain,
+        delta_t,
+        whitening_cut=whitening_cut,
+        whitening_window=whitening_window,
+        bandpass_fmin=bandpass_fmin,
+        bandpass_fmax=bandpass_fmax,
+        edge_seconds=edge_seconds
+    )
+
+    Logger.info(f"Fused vs pycbc preprocessing on {len(strain)} samples (errors relative to the pycbc output, {edge_seconds}s edges excluded)")
+    for taper, metrics in report.items():
+        Logger.info(
+            f"taper={taper}: max abs error {metrics['max_abs_error']:.3e}, "
+            f"rms error {metrics['rms_error']:.3e}, "
+            f"max in-band PSD deviation {metrics['max_band_psd_deviation']:.3e}, "
+            f"pycbc {metrics['pycbc_seconds']:.2f}s, fused {metrics['fused_seconds']:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    auto_cli(main)
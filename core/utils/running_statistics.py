@@ -0,0 +1,34 @@
+import numpy as np
+from dataclasses import dataclass
+from numpy.typing import ArrayLike
+
+
+@dataclass
+class RunningStatistics:
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: float = np.inf
+    maximum: float = -np.inf
+
+    def update(self, values: ArrayLike) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+
+        batch_count = len(values)
+        batch_mean = float(values.mean())
+        batch_m2 = float(np.sum((values - batch_mean) ** 2))
+
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_count / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * batch_count / total
+        self.count = total
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / self.count)) if self.count else np.nan
@@ -0,0 +1,50 @@
+from typing import Any, Dict, Iterable, List
+
+from core.types import WindowBatch
+
+
+def merge_units(units: Iterable[Dict[Any, Any]]) -> Dict[Any, Any]:
+    merged = dict()
+    for unit in units:
+        _deep_update(merged, unit)
+    return merged
+
+
+def merge_batches(batches: Iterable[Any]) -> Any:
+    return concatenate_batches(list(batches))
+
+
+def concatenate_batches(batches: List[Any]) -> Any:
+    batches = [batch for batch in batches if not (isinstance(batch, list) and not batch)]
+    if not batches:
+        return []
+    if isinstance(batches[0], dict):
+        keys = dict.fromkeys(key for batch in batches for key in batch)
+        return {key: concatenate_batches([batch[key] for batch in batches if key in batch]) for key in keys}
+    if isinstance(batches[0], WindowBatch):
+        return WindowBatch.concatenate(batches)
+    return [item for batch in batches for item in batch]
+
+
+def batch_length(batch: Any) -> int:
+    if isinstance(batch, dict):
+        return max((len(value) for value in batch.values()), default=0)
+    return len(batch)
+
+
+def truncate_batch(batch: Any, length: int) -> Any:
+    if isinstance(batch, dict):
+        return {key: value[:length] for key, value in batch.items()}
+    return batch[:length]
+
+
+def _deep_update(target: Dict[Any, Any], source: Dict[Any, Any]) -> None:
+    for key, value in source.items():
+        if isinstance(value, dict) and _is_container(value):
+            _deep_update(target.setdefault(key, {}), value)
+        else:
+            target[key] = value
+
+
+def _is_container(value: Dict[Any, Any]) -> bool:
+    return all(isinstance(item, dict) for item in value.values())
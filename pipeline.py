@@ -11,13 +11,24 @@ class Pipeline:
     loader: LoaderBase
     transformer: TransformerBase
     exporter: ExporterBase
+    streaming: bool = False
 
     def execute(self, destination: str):
         start_time = time.time()
         Logger.info("Starting Pipeline Execution", verbose=False)
-        data = self.loader.load()
-        processed_data = self.transformer.transform(data)
-        self.exporter.export(processed_data, destination)
+        hints = self.transformer.loading_hints()
+
+        if self.streaming:
+            Logger.info("Streaming files through the pipeline", verbose=False)
+            units = self.loader.stream(**hints)
+            batches = self.transformer.transform_stream(units)
+            self.exporter.export_stream(batches, destination)
+            processed_data = None
+        else:
+            data = self.loader.load(**hints)
+            processed_data = self.transformer.transform(data)
+            self.exporter.export(processed_data, destination)
+
         Logger.info("Pipeline Execution Completed.")
         end_time = time.time()
         Logger.info(f"Execution time: {round(end_time - start_time, 2)}", verbose=False)
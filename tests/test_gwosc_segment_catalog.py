@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from core.handlers.gwosc_segment_catalog import GWOSCSegmentCatalog
+
+RUN = "O3b_4KHZ_R1"
+GPS_START = 1256652800
+GPS_END = 1256669184
+
+
+def archive_html(detector: str, segments) -> str:
+    rows = "".join(
+        f"<tr><td>{gps_start}</td><td>4096</td><td>hdf5</td>"
+        f"<td><a href=\"/archive/data/O3b_4KHZ_R1/{detector[0]}-{detector}_GWOSC_O3b_4KHZ_R1-{gps_start}-4096.hdf5\">hdf5</a></td>"
+        f"<td>gwf</td><td>{duty_cycle}</td></tr>"
+        for gps_start, duty_cycle in segments
+    )
+    return (
+        "<html><body><table>"
+        "<tr><th>GPS start</th><th>Duration</th><th>Format</th><th>Link</th><th>Other</th><th>Duty cycle</th></tr>"
+        f"{rows}</table></body></html>"
+    )
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = GWOSCSegmentCatalog(str(tmp_path / "catalog.sqlite"), ttl_hours=1.0)
+    catalog.ingest_html(RUN, "H1", archive_html("H1", [
+        (1256652800, "100.0"), (1256656896, "100.0"), (1256660992, "87.5"), (1256665088, "100.0")
+    ]), GPS_START, GPS_END)
+    catalog.ingest_html(RUN, "L1", archive_html("L1", [
+        (1256652800, "100.0"), (1256660992, "100.0"), (1256665088, "100.0")
+    ]), GPS_START, GPS_END)
+    return catalog
+
+
+def test_ingest_html_parses_segments(tmp_path):
+    catalog = GWOSCSegmentCatalog(str(tmp_path / "catalog.sqlite"))
+    html = archive_html("H1", [(1256652800, "100.0"), (1256656896, "42.0")])
+
+    assert catalog.ingest_html(RUN, "H1", html, GPS_START, GPS_END) == 2
+    assert catalog.ingest_html(RUN, "H1", "<html></html>", GPS_START, GPS_END) == 0
+    assert catalog.coincident_segments(RUN, ["H1"], GPS_START, GPS_END, min_duty_cycle=0.0) == {"H1": []}
+
+
+def test_coincident_segments(catalog):
+    urls = catalog.coincident_segments(RUN, ["H1", "L1"], GPS_START, GPS_END)
+
+    assert [url.rsplit("-", 2)[1] for url in urls["H1"]] == ["1256652800", "1256665088"]
+    assert [url.rsplit("-", 2)[1] for url in urls["L1"]] == ["1256652800", "1256665088"]
+    assert urls["H1"][0] == (
+        "https://gwosc.org/archive/data/O3b_4KHZ_R1/H-H1_GWOSC_O3b_4KHZ_R1-1256652800-4096.hdf5"
+    )
+
+
+def test_coincident_segments_filters(catalog):
+    assert len(catalog.coincident_segments(RUN, ["H1", "L1"], GPS_START, GPS_END, min_duty_cycle=80.0)["H1"]) == 3
+    assert len(catalog.coincident_segments(RUN, ["H1", "L1"], GPS_START, GPS_END, limit=1)["L1"]) == 1
+    assert catalog.coincident_segments(RUN, ["H1", "L1"], GPS_START, GPS_START + 4096)["H1"] == [
+        "https://gwosc.org/archive/data/O3b_4KHZ_R1/H-H1_GWOSC_O3b_4KHZ_R1-1256652800-4096.hdf5"
+    ]
+    assert catalog.coincident_segments(RUN, ["H1", "V1"], GPS_START, GPS_END) == {"H1": [], "V1": []}
+
+
+def test_is_fresh_within_refreshed_span(catalog):
+    assert catalog.is_fresh(RUN, "H1", GPS_START, GPS_END)
+    assert catalog.is_fresh(RUN, "L1", GPS_START + 4096, GPS_END - 4096)
+    assert not catalog.is_fresh(RUN, "H1", GPS_START, GPS_END + 4096)
+    assert not catalog.is_fresh(RUN, "V1", GPS_START, GPS_END)
+
+
+def test_is_fresh_expires_after_ttl(catalog, monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 3599)
+    assert catalog.is_fresh(RUN, "H1", GPS_START, GPS_END)
+
+    monkeypatch.setattr(time, "time", lambda: now + 3601)
+    assert not catalog.is_fresh(RUN, "H1", GPS_START, GPS_END)
@@ -0,0 +1,100 @@
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.handlers.strain_cache import StrainCache
+from core.handlers.strain_downloader import StrainDownloader
+
+FILE_SIZE = 1024
+
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        CountingHandler.requests.append(self.path)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    directory = tmp_path / "remote"
+    directory.mkdir()
+    for name in ("a", "b", "c"):
+        (directory / f"{name}.hdf5").write_bytes(StrainDownloader.HDF5_SIGNATURE + os.urandom(FILE_SIZE - 8))
+
+    CountingHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=str(directory)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_cache(tmp_path, n_files: float = 10) -> StrainCache:
+    return StrainCache(str(tmp_path / "cache"), max_size_gb=n_files * FILE_SIZE / 1024 ** 3)
+
+
+def download(cache: StrainCache, *urls: str):
+    return StrainDownloader(cache, max_retries=1).download(list(urls))
+
+
+def test_miss_downloads_and_hit_reuses_file(server, tmp_path):
+    url = f"{server}/a.hdf5"
+
+    cache = make_cache(tmp_path)
+    path = download(cache, url)[url]
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert os.path.getsize(path) == FILE_SIZE
+
+    cache = make_cache(tmp_path)
+    assert download(cache, url)[url] == path
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert CountingHandler.requests == ["/a.hdf5"]
+
+
+def test_invalid_entry_is_a_miss(server, tmp_path):
+    url = f"{server}/a.hdf5"
+    cache = make_cache(tmp_path)
+    path = download(cache, url)[url]
+
+    with open(path, "ab") as f:
+        f.write(b"corrupt")
+
+    cache = make_cache(tmp_path)
+    assert cache.get(url) is None
+    assert cache.misses == 1
+    assert not os.path.exists(path)
+
+
+def test_evicts_least_recently_used_file(server, tmp_path):
+    a, b, c = (f"{server}/{name}.hdf5" for name in ("a", "b", "c"))
+    cache = make_cache(tmp_path, n_files=2)
+    download(cache, a)
+    download(cache, b)
+    cache.get(a)
+
+    cache = make_cache(tmp_path, n_files=2)
+    download(cache, c)
+
+    assert cache.get(a) is not None
+    assert cache.get(b) is None
+    assert cache.get(c) is not None
+    assert cache.size_bytes() == 2 * FILE_SIZE
+
+
+def test_never_evicts_files_used_by_current_run(server, tmp_path):
+    urls = [f"{server}/{name}.hdf5" for name in ("a", "b", "c")]
+    cache = make_cache(tmp_path, n_files=2)
+    paths = [download(cache, url)[url] for url in urls]
+
+    assert all(os.path.exists(path) for path in paths)
+    assert cache.report()["entries"] == 3
+    assert cache.size_bytes() > cache.max_size_bytes
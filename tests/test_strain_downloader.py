@@ -0,0 +1,60 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.handlers.strain_cache import StrainCache
+from core.handlers.strain_downloader import StrainDownloader
+
+CONTENT = StrainDownloader.HDF5_SIGNATURE + os.urandom(4096)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    statuses = []
+
+    def do_GET(self):
+        start = int(self.headers.get("Range", "bytes=0-")[len("bytes="):].rstrip("-"))
+        if start >= len(CONTENT):
+            self._reply(416, b"", {"Content-Range": f"bytes */{len(CONTENT)}"})
+        elif start:
+            self._reply(206, CONTENT[start:], {"Content-Range": f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}"})
+        else:
+            self._reply(200, CONTENT, {})
+
+    def _reply(self, status, body, headers):
+        RangeHandler.statuses.append(status)
+        self.send_response(status)
+        for name, value in {**headers, "Content-Length": str(len(body))}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    RangeHandler.statuses = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/strain.hdf5"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize("n_partial, status", [(1000, 206), (len(CONTENT), 416)])
+def test_resumes_partial_file(url, tmp_path, n_partial, status):
+    cache = StrainCache(str(tmp_path / "cache"))
+    with open(cache.partial_path(url), "wb") as f:
+        f.write(CONTENT[:n_partial])
+
+    path = StrainDownloader(cache, max_retries=1, chunk_size_mb=0.001).download([url])[url]
+
+    assert RangeHandler.statuses == [status]
+    with open(path, "rb") as f:
+        assert f.read() == CONTENT
+    assert cache.get(url) == path
+    assert not os.path.exists(cache.partial_path(url))